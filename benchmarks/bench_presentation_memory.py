@@ -0,0 +1,92 @@
+"""
+Benchmark: pico de RSS vs número de slides em create_from_text
+
+Cada combinação (tamanho do texto, modo de saída) roda em um processo
+separado, para que o pico de RSS de uma não contamine a outra.
+
+Uso:
+    python benchmarks/bench_presentation_memory.py [--sizes-mb 0.5 1 2 4]
+        [--outputs inline stream]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_text(size_bytes):
+    """
+    Texto com títulos curtos e parágrafos com tópicos, até size_bytes
+    """
+    sections = []
+    total = 0
+    idx = 0
+    while total < size_bytes:
+        section = (
+            f'Seção {idx}\n\n'
+            + '\n'.join(f'Ponto {p} da seção {idx} com algum texto descritivo.' for p in range(6))
+        )
+        sections.append(section)
+        total += len(section) + 2
+        idx += 1
+    return '\n\n'.join(sections)
+
+
+def run(size_mb, output):
+    from src.services.presentation_service import PresentationService
+
+    text = make_text(int(size_mb * 1024 * 1024))
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    result = PresentationService().create_from_text('Benchmark', text, output=output)
+    elapsed = time.perf_counter() - start
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    if 'file' in result:
+        # Consome o arquivo como a rota faria
+        for _ in iter(lambda: result['file'].read(64 * 1024), b''):
+            pass
+        result['file'].close()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'text_mb': size_mb,
+        'output': output,
+        'slides': result['slides_count'],
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(peak_rss / 1024, 1),
+        'delta_rss_mb': round((peak_rss - baseline_rss) / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pico de RSS vs slides em create_from_text')
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[0.5, 1, 2, 4])
+    parser.add_argument('--outputs', nargs='+', default=['inline', 'stream'])
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for size_mb in args.sizes_mb:
+        for output in args.outputs:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                row = pool.submit(run, size_mb, output).result()
+            print(
+                f"{row['text_mb']:>6} MB {row['output']:>7} {row['slides']:>7} slides "
+                f"{row['seconds']:>8.2f}s  pico {row['peak_rss_mb']:>8.1f} MB (+{row['delta_rss_mb']} MB)",
+                file=sys.stderr
+            )
+            results.append(row)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: renderização serial vs paralela de create_slideshow_frames
+
+Uso:
+    python benchmarks/bench_slideshow_frames.py [--counts 2 4 8 16 32] [--repeat 3]
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.services.video_service import VideoService
+
+
+def make_images(count, size=(1024, 768)):
+    """
+    Cria imagens de teste (ruído, para que o PNG não fique trivial)
+    """
+    images = []
+    for idx in range(count):
+        img = Image.effect_noise(size, 40 + idx).convert('RGB')
+        buffered = BytesIO()
+        img.save(buffered, format='JPEG', quality=85)
+        img_base64 = base64.b64encode(buffered.getvalue()).decode()
+        images.append({
+            'image': f'data:image/jpeg;base64,{img_base64}',
+            'caption': f'Slide {idx + 1}: legenda de teste com algumas palavras para quebrar a linha'
+        })
+    return images
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+        assert result['success'], result.get('error')
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[2, 4, 8, 16, 32])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    service = VideoService()
+    print(f'workers: {service.render_workers}')
+
+    # Aquece o pool para não medir a criação dos processos
+    service.create_slideshow_frames(make_images(1), 1, parallel=True)
+
+    print(f"{'slides':>6} {'serial (s)':>11} {'paralelo (s)':>13} {'speedup':>8}")
+    for count in args.counts:
+        images = make_images(count)
+        serial = best_of(lambda: service.create_slideshow_frames(images, 1, parallel=False), args.repeat)
+        parallel = best_of(lambda: service.create_slideshow_frames(images, 1, parallel=True), args.repeat)
+        print(f'{count:>6} {serial:>11.3f} {parallel:>13.3f} {serial / parallel:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
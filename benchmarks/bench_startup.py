@@ -0,0 +1,101 @@
+"""
+Benchmark: tempo de inicialização a frio do app (import de src.main até o
+primeiro /api/health), com o custo de importação quebrado por pacote
+
+Cada repetição roda em um interpretador novo com -X importtime.
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 15] [--warm-up]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_CODE = '''
+import json, sys, time
+start = time.perf_counter()
+from src.main import app
+imported = time.perf_counter()
+response = app.test_client().get('/api/health')
+ready = time.perf_counter()
+from src.services.lazy import startup_report
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_health_ms': (ready - start) * 1000,
+    'status': response.status_code,
+    'report': startup_report()
+}))
+'''
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$')
+
+
+def run_once(warm_up):
+    env = dict(os.environ, WARM_UP='1' if warm_up else '0')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_CODE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    by_package = {}
+    src_modules = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        package = name.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us)
+        if name.startswith('src.'):
+            src_modules[name] = int(cumulative_us)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['by_package_ms'] = {name: us / 1000 for name, us in by_package.items()}
+    result['src_modules_ms'] = {name: us / 1000 for name, us in src_modules.items()}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--warm-up', action='store_true', help='simula o master do gunicorn --preload (WARM_UP=1)')
+    args = parser.parse_args()
+
+    runs = [run_once(args.warm_up) for _ in range(args.repeat)]
+    median = lambda values: statistics.median(values)  # noqa: E731
+
+    print(f"import de src.main: {median([r['import_ms'] for r in runs]):.1f} ms (mediana de {args.repeat})")
+    print(f"primeiro /api/health: {median([r['first_health_ms'] for r in runs]):.1f} ms")
+
+    print('\nEtapas da inicialização (relatório do app):')
+    for step in runs[-1]['report']['steps']:
+        print(f"  {step['name']:<28} {step['ms']:>9.1f} ms")
+
+    print(f'\nImportação por pacote (tempo próprio somado, top {args.top}):')
+    packages = {}
+    for run in runs:
+        for name, ms in run['by_package_ms'].items():
+            packages.setdefault(name, []).append(ms)
+    ranked = sorted(((median(values), name) for name, values in packages.items()), reverse=True)
+    for ms, name in ranked[:args.top]:
+        print(f'  {name:<28} {ms:>9.1f} ms')
+
+    print('\nMódulos do projeto (tempo acumulado):')
+    modules = {}
+    for run in runs:
+        for name, ms in run['src_modules_ms'].items():
+            modules.setdefault(name, []).append(ms)
+    for ms, name in sorted(((median(values), name) for name, values in modules.items()), reverse=True):
+        print(f'  {name:<40} {ms:>9.1f} ms')
+
+    loaded = [service['name'] for service in runs[-1]['report']['services'] if service['loaded']]
+    print(f"\nServiços instanciados na inicialização: {', '.join(loaded) or 'nenhum'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: throughput (frames/s) de iter_video_frames com transições e Ken Burns
+
+Mede apenas a geração dos frames (sem o encoder) na resolução padrão do
+VideoService (1280x720).
+
+Uso:
+    python benchmarks/bench_video_transitions.py [--slides 4] [--duration 2] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_slideshow_frames import make_images  # noqa: E402
+from src.services.video_effects import TRANSITIONS  # noqa: E402
+from src.services.video_service import VideoService  # noqa: E402
+
+
+def measure(service, images, duration, transition, ken_burns, repeat):
+    """
+    Melhor tempo entre as repetições; retorna (frames, segundos)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = 0
+        for _frame in service.iter_video_frames(images, duration, transition, ken_burns=ken_burns):
+            count += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--slides', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=2)
+    parser.add_argument('--transition-duration', type=float, default=0.75)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    service = VideoService()
+    service.transition_duration = args.transition_duration
+    images = make_images(args.slides)
+    print(f'{service.default_width}x{service.default_height} @ {service.default_fps} fps, '
+          f'{args.slides} slides x {args.duration}s')
+
+    print(f"{'transição':>10} {'ken burns':>10} {'frames':>7} {'tempo (s)':>10} {'frames/s':>9}")
+    for transition in (None,) + TRANSITIONS:
+        for ken_burns in (False, True):
+            frames, elapsed = measure(service, images, args.duration, transition, ken_burns, args.repeat)
+            print(f"{transition or '-':>10} {'sim' if ken_burns else 'não':>10} {frames:>7} "
+                  f'{elapsed:>10.3f} {frames / elapsed:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
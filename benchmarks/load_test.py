@@ -0,0 +1,158 @@
+"""
+Teste de carga: requisições/s de /api/generate/image com o Hugging Face
+substituído por um stub local, comparando modelos de worker do gunicorn
+
+Cenários:
+    sync          2 workers síncronos (configuração anterior do render.yaml)
+    gthread       2 workers gthread (GUNICORN_THREADS threads cada)
+    gthread+async gthread com UPSTREAM_ASYNC=1 (event loop por processo)
+
+Uso:
+    python benchmarks/load_test.py [--concurrency 64] [--duration 10]
+        [--latency 0.5] [--threads 32] [--only gthread]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import percentile  # noqa: E402
+from stubs import HuggingFaceStub  # noqa: E402
+
+
+SCENARIOS = [
+    ('sync', {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_THREADS': '1', 'UPSTREAM_ASYNC': '0'}),
+    ('gthread', {'GUNICORN_WORKER_CLASS': 'gthread', 'UPSTREAM_ASYNC': '0'}),
+    ('gthread+async', {'GUNICORN_WORKER_CLASS': 'gthread', 'UPSTREAM_ASYNC': '1'}),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(scenario_env, stub_url, threads):
+    tmp_dir = tempfile.mkdtemp(prefix='load_')
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'WEB_CONCURRENCY': '2',
+        'GUNICORN_THREADS': str(threads),
+        'HF_API_URL': stub_url,
+        # Sem limitação local: mede apenas o modelo de concorrência
+        'HF_RATE_LIMIT': '100000',
+        'HF_RATE_BURST': '100000',
+        'IMAGE_CACHE_DIR': os.path.join(tmp_dir, 'image_cache'),
+        'IMAGE_VARIANT_CACHE_DIR': os.path.join(tmp_dir, 'image_variants'),
+        'ARTIFACT_DIR': os.path.join(tmp_dir, 'artifacts'),
+        'METRICS_DIR': os.path.join(tmp_dir, 'metrics'),
+        'JOB_DB_PATH': os.path.join(tmp_dir, 'jobs.db'),
+    })
+    env.update(scenario_env)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'src.main:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(200):
+        try:
+            if requests.get(f'{base_url}/api/health', timeout=1).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('O servidor não respondeu ao health check')
+
+
+def run_load(base_url, concurrency, duration):
+    """
+    concurrency clientes em laço fechado durante duration segundos
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+    counter = iter(range(10 ** 9))
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    f'{base_url}/api/generate/image',
+                    json={'prompt': f'load test {next(counter)}', 'bypass_cache': True},
+                    timeout=60
+                )
+                ok = response.status_code == 200 and response.json().get('success') and not response.json().get('fallback')
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_sec': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=0.5, help='latência do stub do Hugging Face (s)')
+    parser.add_argument('--threads', type=int, default=32, help='threads por worker gthread')
+    parser.add_argument('--only', help='roda apenas cenários cujo nome contém este texto')
+    args = parser.parse_args()
+
+    results = {}
+    with HuggingFaceStub(latency=args.latency) as stub:
+        for name, scenario_env in SCENARIOS:
+            if args.only and args.only not in name:
+                continue
+            print(f'-> {name}', file=sys.stderr)
+            proc, base_url = start_server(scenario_env, stub.url, args.threads)
+            try:
+                results[name] = run_load(base_url, args.concurrency, args.duration)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+    print(json.dumps({
+        'config': vars(args),
+        'results': results
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
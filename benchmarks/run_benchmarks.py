@@ -0,0 +1,278 @@
+"""
+Micro-benchmarks offline dos quatro serviços (Search, Image, Presentation, Video)
+
+Os serviços externos são substituídos por stubs locais (ver stubs.py), então o
+resultado mede apenas o nosso código mais a latência simulada. Cada caso roda
+em um processo separado para que o pico de RSS seja medido isoladamente.
+
+Uso:
+    python benchmarks/run_benchmarks.py [--iterations 20] [--latency 0.05]
+        [--only presentation] [--output resultado.json]
+        [--baseline baseline.json] [--threshold 10]
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+LONG_CAPTION = ' '.join(
+    'Legenda longa usada para medir a quebra de linhas e o desenho do texto'.split() * 20
+)
+
+
+def _make_image_uri(size, seed):
+    from PIL import Image
+
+    img = Image.effect_noise(size, 30 + seed).convert('RGB')
+    buffered = BytesIO()
+    img.save(buffered, format='JPEG', quality=85)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffered.getvalue()).decode()
+
+
+def build_presentation(config, slides):
+    from src.services.presentation_service import PresentationService
+
+    service = PresentationService()
+    slides_data = [
+        {'title': f'Slide {idx}', 'content': [f'Ponto {p} do slide {idx}' for p in range(5)]}
+        for idx in range(slides)
+    ]
+    return lambda: service.create_presentation('Benchmark', slides_data), None
+
+
+def build_slideshow(config, count, width, height):
+    from src.services.video_service import VideoService
+
+    service = VideoService()
+    images = [
+        {'image': _make_image_uri((width, height), idx), 'caption': f'Slide {idx + 1}'}
+        for idx in range(count)
+    ]
+    return lambda: service.create_slideshow_frames(images, 1), None
+
+
+def build_placeholder(config):
+    from src.services.image_service import ImageService
+
+    service = ImageService()
+    counter = iter(range(10 ** 9))
+    # Textos diferentes a cada chamada para medir a renderização, não caches
+    return lambda: service.generate_simple_placeholder(f'Placeholder {next(counter)}'), None
+
+
+def build_caption_layout(config):
+    from PIL import Image
+    from src.services.video_service import VideoService
+
+    service = VideoService()
+    img = Image.new('RGB', (service.default_width, service.default_height), (40, 40, 40))
+
+    def op():
+        service._add_caption(img, LONG_CAPTION)
+        return {'success': True}
+    return op, None
+
+
+def build_generate_image(config):
+    from stubs import HuggingFaceStub
+    from src.services.image_service import ImageService
+
+    stub = HuggingFaceStub(latency=config['latency']).__enter__()
+    service = ImageService()
+    service.api_url = stub.url
+    op = lambda: service.generate_image('benchmark prompt', use_cache=False)
+    return op, lambda: stub.__exit__(None, None, None)
+
+
+def build_combined_search(config, cached):
+    from stubs import WikipediaStub, make_ddgs_stub
+    import src.services.search_service as search_module
+
+    search_module.DDGS = make_ddgs_stub(config['latency'])
+    service = search_module.SearchService()
+    service.wiki = WikipediaStub(config['latency'])
+
+    def op():
+        if not cached:
+            service.web_cache.clear()
+            service.wiki_cache.clear()
+        return service.combined_search('benchmark')
+    return op, None
+
+
+def build_job_status(config):
+    from flask import Flask
+    from src.routes.api import api_bp, job_service
+
+    # Só o blueprint da API: as rotas de jobs não usam o app.db
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    client = app.test_client()
+    job_id = job_service.submit('benchmark', lambda data: {'success': True}, {})['job_id']
+
+    def op():
+        # Consulta simples, sem ?wait (regressão: o proxy LazyService
+        # escondia JobService.get e a rota respondia 500)
+        response = client.get(f'/api/jobs/{job_id}')
+        if response.status_code != 200:
+            return {'success': False, 'error': f'status {response.status_code}'}
+        return response.get_json()
+    return op, None
+
+
+CASES = [
+    ('presentation.create_presentation[slides=5]', build_presentation, {'slides': 5}),
+    ('presentation.create_presentation[slides=25]', build_presentation, {'slides': 25}),
+    ('presentation.create_presentation[slides=100]', build_presentation, {'slides': 100}),
+    ('video.create_slideshow_frames[n=3,640x480]', build_slideshow, {'count': 3, 'width': 640, 'height': 480}),
+    ('video.create_slideshow_frames[n=10,640x480]', build_slideshow, {'count': 10, 'width': 640, 'height': 480}),
+    ('video.create_slideshow_frames[n=3,1920x1080]', build_slideshow, {'count': 3, 'width': 1920, 'height': 1080}),
+    ('video.caption_layout', build_caption_layout, {}),
+    ('image.generate_simple_placeholder', build_placeholder, {}),
+    ('image.generate_image[stub]', build_generate_image, {}),
+    ('search.combined_search[stub]', build_combined_search, {'cached': False}),
+    ('search.combined_search[cached]', build_combined_search, {'cached': True}),
+    ('api.get_job[poll]', build_job_status, {}),
+]
+
+
+def percentile(sorted_values, pct):
+    """
+    Percentil com interpolação linear (valores já ordenados)
+    """
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * pct / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def run_case(index, config):
+    """
+    Executa um caso (no processo filho) e retorna as métricas
+    """
+    tmp_dir = tempfile.mkdtemp(prefix='bench_')
+    os.environ['IMAGE_CACHE_DIR'] = os.path.join(tmp_dir, 'image_cache')
+    os.environ['IMAGE_VARIANT_CACHE_DIR'] = os.path.join(tmp_dir, 'image_variants')
+    os.environ['ARTIFACT_DIR'] = os.path.join(tmp_dir, 'artifacts')
+    os.environ['JOB_DB_PATH'] = os.path.join(tmp_dir, 'jobs.db')
+
+    name, builder, params = CASES[index]
+    op, cleanup = builder(config, **params)
+    try:
+        for _ in range(config['warmup']):
+            op()
+
+        timings = []
+        start_all = time.perf_counter()
+        for _ in range(config['iterations']):
+            start = time.perf_counter()
+            result = op()
+            timings.append(time.perf_counter() - start)
+            if not result.get('success', True):
+                raise RuntimeError(f'{name}: {result.get("error")}')
+        elapsed = time.perf_counter() - start_all
+    finally:
+        if cleanup:
+            cleanup()
+
+    timings.sort()
+    return {
+        'params': params,
+        'iterations': len(timings),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'throughput_ops': round(len(timings) / elapsed, 3),
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        'peak_rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+            1
+        )
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compara com um baseline salvo; retorna (relatório, houve regressão)
+    """
+    report = {}
+    regressed = False
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        delta = {}
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_ops', 'peak_rss_mb'):
+            if previous.get(metric):
+                delta[metric] = round((current[metric] - previous[metric]) / previous[metric] * 100, 2)
+        delta['regression'] = delta.get('p50_ms', 0) > threshold
+        regressed = regressed or delta['regression']
+        report[name] = delta
+    return report, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks offline do AI Content Studio')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.05, help='latência dos stubs em segundos')
+    parser.add_argument('--only', help='roda apenas casos cujo nome contém este texto')
+    parser.add_argument('--output', help='grava o JSON neste arquivo (padrão: stdout)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='aumento percentual de p50 considerado regressão')
+    args = parser.parse_args()
+
+    config = {'iterations': args.iterations, 'warmup': args.warmup, 'latency': args.latency}
+    results = {}
+    for index, (name, _, _) in enumerate(CASES):
+        if args.only and args.only not in name:
+            continue
+        print(f'-> {name}', file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results[name] = pool.submit(run_case, index, config).result()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'config': config
+        },
+        'results': results
+    }
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'], regressed = compare(results, json.load(f), args.threshold)
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
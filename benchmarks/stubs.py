@@ -0,0 +1,111 @@
+"""
+Substitutos locais para os serviços externos (Hugging Face, DuckDuckGo, Wikipedia)
+
+Todos aceitam uma latência configurável (em segundos) para simular o upstream.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PIL import Image
+
+
+def make_png(size=(512, 512), color=(120, 80, 200)):
+    buffered = BytesIO()
+    Image.new('RGB', size, color).save(buffered, format='PNG')
+    return buffered.getvalue()
+
+
+class HuggingFaceStub:
+    """
+    Servidor HTTP local que responde como a Inference API (PNG no corpo)
+    """
+
+    def __init__(self, latency=0.05, image_size=(512, 512)):
+        self.latency = latency
+        self.png = make_png(image_size)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(stub.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(stub.png)))
+                self.end_headers()
+                self.wfile.write(stub.png)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/models/stub'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_ddgs_stub(latency=0.05):
+    """
+    Classe compatível com duckduckgo_search.DDGS
+    """
+    class DDGSStub:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def text(self, query, max_results=5):
+            time.sleep(latency)
+            return [
+                {
+                    'title': f'{query} {idx}',
+                    'body': f'Resultado {idx} sobre {query}. ' * 5,
+                    'href': f'https://example.com/{idx}'
+                }
+                for idx in range(max_results)
+            ]
+
+    return DDGSStub
+
+
+class _PageStub:
+    def __init__(self, title, latency):
+        self.title = title
+        self._latency = latency
+        self.summary = f'{title} é um tópico de teste. ' * 40
+        self.text = f'Conteúdo sobre {title}. ' * 400
+        self.fullurl = f'https://pt.wikipedia.org/wiki/{title}'
+
+    def exists(self):
+        time.sleep(self._latency)
+        return True
+
+
+class WikipediaStub:
+    """
+    Objeto compatível com o uso de wikipediaapi.Wikipedia no SearchService
+    """
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.language = 'pt'
+
+    def page(self, title):
+        return _PageStub(title, self.latency)
+
+    def search(self, query, results=3):
+        time.sleep(self.latency)
+        return [f'{query} {idx}' for idx in range(results)]
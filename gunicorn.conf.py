@@ -0,0 +1,31 @@
+"""
+Configuração do gunicorn (gunicorn -c gunicorn.conf.py src.main:app)
+
+O worker gthread atende várias requisições por processo com threads: as que
+estão esperando o Hugging Face, o DuckDuckGo ou a Wikipedia não ocupam o
+processo inteiro. Com UPSTREAM_ASYNC=1, essas chamadas ainda passam por um
+único event loop por processo.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+# Conexões ociosas do keep-alive não devem prender threads por muito tempo
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # Manifesto dos estáticos (com as variantes gzip/brotli) montado antes de
+    # o worker aceitar conexões; com --preload e WARM_UP=1 já vem do master
+    from src.main import build_static_manifest
+    build_static_manifest()
+
+
+def child_exit(server, worker):
+    # Roda no master, inclusive para workers mortos por sinal (timeout), que
+    # não chegam a apagar o próprio snapshot de métricas
+    from src.services.metrics_service import metrics
+    metrics.remove_snapshot(worker.pid)
@@ -1,13 +1,21 @@
 import os
 import sys
+import threading
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.api import api_bp
-from flask_cors import CORS
+from src.services.lazy import startup_step, warm_up_modules
+
+with startup_step('import flask, sqlalchemy'):
+    from flask import Flask, send_from_directory
+    from sqlalchemy import event
+    from src.models.user import db
+    from flask_cors import CORS
+
+with startup_step('import routes'):
+    from src.routes.user import user_bp
+    from src.routes.api import api_bp
+    from src.services.static_assets import StaticManifest
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -20,12 +28,75 @@ app.register_blueprint(api_bp, url_prefix='/api')
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
-with app.app_context():
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL: os workers do gunicorn leem enquanto um deles escreve
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA cache_size=-16000')
+    cursor.close()
+
+
+with startup_step('db.create_all'), app.app_context():
+    event.listen(db.engine, 'connect', _configure_sqlite)
     db.create_all()
 
+# Arquivos estáticos lidos uma vez e servidos da memória (STATIC_MANIFEST=0
+# serve direto do disco, útil durante o desenvolvimento do frontend)
+STATIC_MANIFEST_ENABLED = bool(
+    app.static_folder and os.getenv('STATIC_MANIFEST', '1') == '1' and os.path.isdir(app.static_folder)
+)
+static_manifest = None
+_static_manifest_lock = threading.Lock()
+
+
+def build_static_manifest():
+    """
+    Lê e comprime os arquivos estáticos (uma vez por processo)
+
+    Não roda no import: o gunicorn chama esta função em post_worker_init
+    (ou no master, com --preload e WARM_UP=1), antes de o worker aceitar
+    conexões, então a compressão nunca cai em uma requisição.
+    """
+    global static_manifest
+    if static_manifest is None and STATIC_MANIFEST_ENABLED:
+        with _static_manifest_lock:
+            if static_manifest is None:
+                with startup_step('static manifest'):
+                    static_manifest = StaticManifest(app.static_folder)
+    return static_manifest
+
+
+def warm_up():
+    """
+    Carrega de antemão os módulos dos serviços e os arquivos estáticos
+
+    Pensado para o gunicorn --preload (WARM_UP=1): roda uma vez no master e
+    os workers já nascem com tudo carregado. Os serviços continuam sendo
+    instanciados em cada worker, no primeiro uso.
+    """
+    with startup_step('warm-up'):
+        warm_up_modules()
+        build_static_manifest()
+
+
+if os.getenv('WARM_UP') == '1':
+    warm_up()
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
+    manifest = build_static_manifest()
+    if manifest is not None:
+        response = manifest.response(path)
+        if response is not None:
+            return response
+        return "index.html not found", 404
+
     static_folder_path = app.static_folder
     if static_folder_path is None:
             return "Static folder not configured", 404
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from src.models.user import db
+
+class GeneratedArtifact(db.Model):
+    """
+    Histórico de conteúdos gerados (imagens, apresentações, vídeos)
+
+    O arquivo fica no ArtifactStore (name = sha256 + extensão); params_hash
+    identifica a requisição que o gerou, para reaproveitar o resultado.
+    """
+    __tablename__ = 'generated_artifact'
+    __table_args__ = (
+        db.Index('ix_generated_artifact_owner_created', 'owner', 'created_at'),
+        db.Index('ix_generated_artifact_params', 'params_hash', 'kind'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    name = db.Column(db.String(80), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    owner = db.Column(db.String(120))
+    params_hash = db.Column(db.String(64), nullable=False)
+    mime_type = db.Column(db.String(120), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GeneratedArtifact {self.kind} {self.content_hash[:12]}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'content_hash': self.content_hash,
+            'name': self.name,
+            'kind': self.kind,
+            'owner': self.owner,
+            'params_hash': self.params_hash,
+            'mime_type': self.mime_type,
+            'size': self.size,
+            'created_at': self.created_at.isoformat()
+        }
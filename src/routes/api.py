@@ -1,21 +1,110 @@
 """
 Rotas da API para o AI Content Studio
 """
-from flask import Blueprint, request, jsonify, send_file
-from src.services.search_service import SearchService
-from src.services.image_service import ImageService
-from src.services.presentation_service import PresentationService
-from src.services.video_service import VideoService
+from flask import Blueprint, request, jsonify, send_file, g, Response, current_app
+from src.services.artifact_service import ArtifactStore
+from src.services.history_service import HistoryService
+from src.services.image_format import normalize_format
+from src.services.lazy import LazyService, startup_report
+from src.services.metrics_service import metrics
+import os
+import time
 import base64
+import math
+import unicodedata
 from io import BytesIO
+from urllib.parse import quote
 
 api_bp = Blueprint('api', __name__)
 
-# Inicializa serviços
-search_service = SearchService()
-image_service = ImageService()
-presentation_service = PresentationService()
-video_service = VideoService()
+# Inicializa serviços; os que dependem de bibliotecas pesadas (PIL, pptx,
+# numpy, duckduckgo_search, wikipediaapi) só são carregados no primeiro uso
+artifact_store = ArtifactStore()
+history_service = HistoryService(artifact_store)
+search_service = LazyService('search', 'src.services.search_service', 'SearchService')
+image_service = LazyService(
+    'image', 'src.services.image_service', 'ImageService',
+    lambda: {'artifact_store': artifact_store}
+)
+presentation_service = LazyService(
+    'presentation', 'src.services.presentation_service', 'PresentationService',
+    lambda: {'artifact_store': artifact_store, 'search_service': search_service}
+)
+video_service = LazyService('video', 'src.services.video_service', 'VideoService')
+job_service = LazyService('jobs', 'src.services.job_service', 'JobService')
+
+# UPSTREAM_ASYNC=1: chamadas ao Hugging Face e pesquisas passam pelo event
+# loop compartilhado do processo (ver async_upstream)
+UPSTREAM_ASYNC = os.getenv('UPSTREAM_ASYNC', '0') == '1'
+async_image_service = LazyService(
+    'image_async', 'src.services.async_upstream', 'AsyncImageService',
+    lambda: {'image_service': image_service._resolve()}
+)
+async_search_service = LazyService(
+    'search_async', 'src.services.async_upstream', 'AsyncSearchService',
+    lambda: {'search_service': search_service._resolve()}
+)
+
+# Tempo máximo de espera no long-poll (abaixo do timeout do gunicorn)
+JOB_MAX_WAIT = float(os.getenv('JOB_MAX_WAIT', '60'))
+
+# Prazo máximo (s) que o cliente pode pedir para a pesquisa combinada
+SEARCH_MAX_DEADLINE = float(os.getenv('SEARCH_MAX_DEADLINE', '30'))
+
+# Validade (s) no histórico dos decks gerados com pesquisa na web
+RESEARCH_HISTORY_TTL = float(os.getenv('RESEARCH_HISTORY_TTL', '86400'))
+
+# Número máximo de prompts por requisição em lote
+IMAGE_BATCH_MAX_ITEMS = int(os.getenv('IMAGE_BATCH_MAX_ITEMS', '16'))
+
+
+def _upstream_call(service, async_service, method, *args, **kwargs):
+    """
+    Chama o método no serviço síncrono ou, com UPSTREAM_ASYNC, na variante
+    assíncrona (executada no event loop do processo)
+    """
+    if UPSTREAM_ASYNC:
+        from src.services.async_upstream import runner
+        return runner.run(getattr(async_service, method)(*args, **kwargs))
+    return getattr(service, method)(*args, **kwargs)
+
+
+def _endpoint_label():
+    # Usa a regra da rota (ex.: /jobs/<job_id>) para limitar a cardinalidade
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+@api_bp.before_request
+def _start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_endpoint = _endpoint_label()
+    metrics.gauge_add('http_requests_in_flight', 1, endpoint=g.metrics_endpoint)
+
+
+@api_bp.after_request
+def _record_request_metrics(response):
+    endpoint = g.get('metrics_endpoint')
+    if endpoint is None:
+        return response
+    metrics.observe(
+        'http_request_duration_seconds',
+        time.perf_counter() - g.metrics_start,
+        endpoint=endpoint,
+        method=request.method,
+        status=response.status_code
+    )
+    if response.content_length is not None:
+        metrics.observe('http_response_size_bytes', response.content_length, endpoint=endpoint)
+    if response.status_code >= 500:
+        metrics.inc('http_request_errors_total', endpoint=endpoint)
+    return response
+
+
+@api_bp.teardown_request
+def _finish_request_metrics(exc):
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is not None:
+        metrics.gauge_add('http_requests_in_flight', -1, endpoint=endpoint)
 
 
 @api_bp.route('/search', methods=['POST'])
@@ -34,7 +123,23 @@ def search():
             }), 400
         
         max_results = data.get('max_results', 5)
-        results = search_service.combined_search(query, max_results)
+        deadline = data.get('deadline')
+        if deadline is not None:
+            try:
+                if isinstance(deadline, bool):
+                    raise ValueError
+                deadline = float(deadline)
+            except (TypeError, ValueError):
+                deadline = None
+            # A comparação também recusa NaN
+            if deadline is None or not deadline > 0:
+                return jsonify({
+                    'success': False,
+                    'error': '"deadline" deve ser um número positivo (segundos)'
+                }), 400
+            deadline = min(deadline, SEARCH_MAX_DEADLINE)
+        results = _upstream_call(search_service, async_search_service, 'combined_search',
+                                 query, max_results, deadline)
         
         return jsonify(results), 200
         
@@ -98,10 +203,24 @@ def search_wikipedia():
         }), 500
 
 
+@api_bp.route('/search/cache', methods=['GET'])
+def search_cache_stats():
+    """
+    Endpoint com estatísticas dos caches de pesquisa
+    """
+    return jsonify(search_service.cache_stats()), 200
+
+
 @api_bp.route('/generate/image', methods=['POST'])
 def generate_image():
     """
     Endpoint de geração de imagens
+    
+    Com "output": "artifact", a resposta traz uma URL de download em vez do base64.
+    Com "async": true, a geração é enfileirada e o endpoint retorna um job_id
+    Aceita "format" (png, jpeg, webp), "quality" e "thumbnail" (lado máximo
+    em pixels); sem "format", a imagem do upstream é repassada sem conversão.
+    "num_inference_steps" (padrão 25) é repassado ao modelo.
     """
     try:
         data = request.get_json()
@@ -113,22 +232,184 @@ def generate_image():
                 'error': 'Prompt não pode estar vazio'
             }), 400
         
-        negative_prompt = data.get('negative_prompt', '')
-        use_placeholder = data.get('use_placeholder', False)
+        error = _validate_image_options(data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
         
-        if use_placeholder:
-            # Gera placeholder local
-            result = image_service.generate_simple_placeholder(prompt[:50])
-        else:
-            # Tenta gerar via Hugging Face
-            result = image_service.generate_image(prompt, negative_prompt)
-            
-            # Se falhar, gera placeholder
-            if not result['success'] and result.get('status') != 'rate_limited':
-                result = image_service.generate_simple_placeholder(prompt[:50])
-                result['fallback'] = True
+        if data.get('async'):
+            return _submit_job('image', _run_image_generation, data)
         
-        return jsonify(result), 200
+        return jsonify(_run_image_generation(data)), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _run_image_generation(data):
+    """
+    Gera a imagem (ou placeholder) a partir dos dados da requisição
+    """
+    prompt = data.get('prompt', '').strip()
+    negative_prompt = data.get('negative_prompt', '')
+    num_inference_steps = data.get('num_inference_steps') or 25
+    use_placeholder = data.get('use_placeholder', False)
+    use_cache = not data.get('bypass_cache', False)
+    output = data.get('output', 'inline')
+    options = _image_options(data)
+    
+    if use_placeholder:
+        # Gera placeholder local
+        return image_service.generate_simple_placeholder(prompt[:50], output=output, **options)
+    
+    # Artefatos únicos (sem miniatura) entram no histórico e são reaproveitados
+    params_hash = None
+    if output == 'artifact' and not options['thumbnail']:
+        params_hash = history_service.params_hash('image', {
+            'model': image_service.api_url,
+            'prompt': prompt,
+            'negative_prompt': negative_prompt,
+            'num_inference_steps': num_inference_steps,
+            'format': options['image_format'],
+            'quality': options['quality']
+        })
+        if use_cache:
+            artifact = history_service.find('image', params_hash)
+            size = _artifact_image_size(artifact) if artifact else None
+            if size:
+                return _reused_result(artifact, format=artifact['mime_type'].split('/', 1)[1], size=size)
+    
+    # Tenta gerar via Hugging Face
+    result = _upstream_call(image_service, async_image_service, 'generate_image',
+                            prompt, negative_prompt, num_inference_steps,
+                            use_cache=use_cache, output=output, **options)
+    if params_hash and result['success']:
+        history_service.record('image', result['artifact'], params_hash, data.get('owner'))
+    return _with_placeholder_fallback(result, prompt, output, options)
+
+
+def _reused_result(artifact, **extra):
+    """
+    Resultado de uma geração anterior com os mesmos parâmetros (histórico)
+    """
+    result = {
+        'success': True,
+        'artifact': artifact,
+        'url': artifact['url'],
+        'reused': True
+    }
+    result.update(extra)
+    return result
+
+
+def _artifact_image_size(artifact):
+    """
+    Dimensões da imagem guardada (só o cabeçalho é lido); None se o arquivo
+    não estiver mais no ArtifactStore
+    """
+    from PIL import Image
+    
+    path = artifact_store.path_for(artifact['name'])
+    if path is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except OSError:
+        return None
+
+
+def _with_placeholder_fallback(result, prompt, output, options=None):
+    """
+    Substitui uma geração que falhou por um placeholder
+    """
+    # Se falhar, gera placeholder
+    if not result['success'] and result.get('status') != 'rate_limited':
+        metrics.inc('image_fallback_total', reason=result.get('status', 'error'))
+        result = image_service.generate_simple_placeholder(prompt[:50], output=output, **(options or {}))
+        result['fallback'] = True
+    
+    return result
+
+
+def _image_options(data):
+    """
+    Opções de formato de saída da imagem (format, quality, thumbnail)
+    """
+    return {
+        'image_format': data.get('format'),
+        'quality': data.get('quality'),
+        'thumbnail': data.get('thumbnail')
+    }
+
+
+def _validate_image_options(data):
+    """
+    Valida as opções de formato; retorna a mensagem de erro ou None
+    """
+    try:
+        normalize_format(data.get('format'))
+    except ValueError as e:
+        return str(e)
+    for field in ('quality', 'thumbnail', 'num_inference_steps'):
+        value = data.get(field)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+            return f'"{field}" deve ser um inteiro positivo'
+    return None
+
+
+@api_bp.route('/generate/images', methods=['POST'])
+def generate_images():
+    """
+    Endpoint de geração de imagens em lote
+    
+    Recebe "prompts" (textos ou objetos com prompt/negative_prompt) e retorna
+    um resultado por item, na mesma ordem, com fallback individual.
+    Aceita "concurrency", "output", "bypass_cache", "async" e as opções de
+    formato de /generate/image ("format", "quality", "thumbnail").
+    """
+    try:
+        data = request.get_json()
+        items = _parse_batch_prompts(data.get('prompts'))
+        
+        if not items:
+            return jsonify({
+                'success': False,
+                'error': 'Forneça uma lista de prompts não vazios (textos ou objetos com "prompt")'
+            }), 400
+        
+        error = _validate_image_options(data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        if len(items) > IMAGE_BATCH_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'error': f'Máximo de {IMAGE_BATCH_MAX_ITEMS} prompts por requisição'
+            }), 400
+        
+        concurrency = data.get('concurrency')
+        if concurrency is not None:
+            if not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1:
+                return jsonify({
+                    'success': False,
+                    'error': '"concurrency" deve ser um inteiro positivo'
+                }), 400
+            # Nunca acima do pool configurado (HF_BATCH_CONCURRENCY)
+            data['concurrency'] = min(concurrency, image_service.batch_concurrency)
+        
+        if data.get('async'):
+            return _submit_job('image_batch', _run_image_batch, data)
+        
+        return jsonify(_run_image_batch(data)), 200
         
     except Exception as e:
         return jsonify({
@@ -137,31 +418,109 @@ def generate_image():
         }), 500
 
 
+def _parse_batch_prompts(prompts):
+    """
+    Normaliza a lista de prompts do lote (None se inválida)
+    """
+    if not isinstance(prompts, list):
+        return None
+    items = []
+    for entry in prompts:
+        if isinstance(entry, str):
+            item = {'prompt': entry}
+        elif isinstance(entry, dict):
+            item = dict(entry)
+        else:
+            return None
+        item['prompt'] = str(item.get('prompt', '')).strip()
+        if not item['prompt'] or _validate_image_options({'num_inference_steps': item.get('num_inference_steps')}):
+            return None
+        items.append(item)
+    return items
+
+
+def _run_image_batch(data):
+    """
+    Gera todas as imagens do lote com concorrência limitada
+    """
+    items = _parse_batch_prompts(data.get('prompts'))
+    output = data.get('output', 'inline')
+    options = _image_options(data)
+    results = _upstream_call(
+        image_service, async_image_service, 'generate_images',
+        items,
+        max_concurrency=data.get('concurrency'),
+        use_cache=not data.get('bypass_cache', False),
+        output=output,
+        **options
+    )
+    results = [
+        _with_placeholder_fallback(result, item['prompt'], output, options)
+        for item, result in zip(items, results)
+    ]
+    
+    return {
+        'success': all(result['success'] for result in results),
+        'results': results,
+        'count': len(results),
+        'fallbacks': sum(1 for result in results if result.get('fallback'))
+    }
+
+
+@api_bp.route('/generate/image/cache', methods=['GET'])
+def image_cache_stats():
+    """
+    Endpoint com estatísticas do cache de imagens
+    """
+    return jsonify(image_service.cache_stats()), 200
+
+
 @api_bp.route('/generate/presentation', methods=['POST'])
 def generate_presentation():
     """
     Endpoint de geração de apresentações
+    
+    Com "output": "artifact", a resposta traz uma URL de download em vez do base64.
+    Com "output": "stream", o .pptx é enviado diretamente em blocos (decks grandes).
+    Com "topic" e "research": true, o conteúdo vem da Wikipedia e do DuckDuckGo.
     """
     try:
         data = request.get_json()
         title = data.get('title', 'Apresentação').strip()
+        output = data.get('output', 'inline')
+        template = data.get('template')
+        
+        # Apresentações publicadas como artefato entram no histórico e são reaproveitadas
+        params_hash = None
+        if output == 'artifact':
+            params_hash = history_service.params_hash('presentation', {
+                field: data.get(field)
+                for field in ('title', 'topic', 'num_slides', 'research', 'text_content', 'slides_data', 'template')
+            })
+            if not data.get('bypass_cache'):
+                # Decks de pesquisa dependem da web: só valem por um tempo
+                max_age = RESEARCH_HISTORY_TTL if data.get('research') else None
+                artifact = history_service.find('presentation', params_hash, max_age=max_age)
+                if artifact:
+                    return jsonify(_reused_result(artifact)), 200
         
         # Verifica tipo de geração
         if 'topic' in data:
             # Gera a partir de tópico
             topic = data['topic'].strip()
             num_slides = data.get('num_slides', 5)
-            result = presentation_service.generate_from_topic(topic, num_slides)
+            research = data.get('research', False)
+            result = presentation_service.generate_from_topic(topic, num_slides, output, template, research)
         
         elif 'text_content' in data:
             # Gera a partir de texto
             text_content = data['text_content'].strip()
-            result = presentation_service.create_from_text(title, text_content)
+            result = presentation_service.create_from_text(title, text_content, output, template)
         
         elif 'slides_data' in data:
             # Gera a partir de dados estruturados
             slides_data = data['slides_data']
-            result = presentation_service.create_presentation(title, slides_data)
+            result = presentation_service.create_presentation(title, slides_data, output, template)
         
         else:
             return jsonify({
@@ -169,6 +528,13 @@ def generate_presentation():
                 'error': 'Forneça topic, text_content ou slides_data'
             }), 400
         
+        if result['success'] and 'file' in result:
+            from src.services.presentation_service import PPTX_MIME_TYPE
+            return _stream_file(result['file'], result['size'], PPTX_MIME_TYPE, result['filename'])
+        
+        if params_hash and result['success']:
+            history_service.record('presentation', result['artifact'], params_hash, data.get('owner'))
+        
         return jsonify(result), 200
         
     except Exception as e:
@@ -182,6 +548,13 @@ def generate_presentation():
 def generate_video():
     """
     Endpoint de geração de vídeos (slideshow)
+    
+    Com "format": "mp4", o vídeo é codificado em H.264 e enviado como download;
+    "transition" (crossfade, slide, zoom), "transition_duration" e
+    "ken_burns": true adicionam movimento entre e durante os slides.
+    Com "async": true, a geração é enfileirada e o endpoint retorna um job_id
+    Os frames são PNG por padrão; "frame_format" (jpeg, webp) e "quality"
+    reduzem o tamanho da resposta.
     """
     try:
         data = request.get_json()
@@ -193,24 +566,39 @@ def generate_video():
                 'error': 'Forneça pelo menos uma imagem'
             }), 400
         
-        duration_per_image = data.get('duration_per_image', 3)
-        title = data.get('title', 'Vídeo')
-        description = data.get('description', '')
+        if not isinstance(images_data, list) or not all(isinstance(item, dict) for item in images_data):
+            return jsonify({
+                'success': False,
+                'error': '"images" deve ser uma lista de objetos (com "image" e "caption" opcionais)'
+            }), 400
+        
+        error = _validate_image_options({'format': data.get('frame_format'), 'quality': data.get('quality')})
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
         
-        # Cria frames do slideshow
-        result = video_service.create_slideshow_frames(images_data, duration_per_image)
+        if data.get('format') == 'mp4':
+            from src.services.video_effects import TRANSITIONS
+            transition = data.get('transition')
+            if transition is not None and transition not in TRANSITIONS:
+                return jsonify({
+                    'success': False,
+                    'error': f'"transition" deve ser um de: {", ".join(TRANSITIONS)}'
+                }), 400
+            error = _validate_mp4_durations(data)
+            if error:
+                return jsonify({
+                    'success': False,
+                    'error': error
+                }), 400
+            return _export_video_mp4(data)
         
-        if result['success']:
-            # Adiciona metadados
-            metadata = video_service.create_video_metadata(
-                title,
-                description,
-                result['total_frames'],
-                result['total_duration']
-            )
-            result['metadata'] = metadata
+        if data.get('async'):
+            return _submit_job('video', _run_video_generation, data)
         
-        return jsonify(result), 200
+        return jsonify(_run_video_generation(data)), 200
         
     except Exception as e:
         return jsonify({
@@ -219,6 +607,281 @@ def generate_video():
         }), 500
 
 
+def _parse_seconds(value):
+    """
+    Converte uma duração em segundos para float (None se não for um número finito)
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _validate_mp4_durations(data):
+    """
+    Valida "duration_per_image" (positivo) e "transition_duration" (não
+    negativo, limitado a metade da duração de cada imagem); retorna a
+    mensagem de erro ou None
+    """
+    raw_duration = data.get('duration_per_image', 3)
+    duration_per_image = _parse_seconds(raw_duration)
+    if duration_per_image is None or duration_per_image <= 0:
+        return '"duration_per_image" deve ser um número positivo (segundos)'
+    if not isinstance(raw_duration, (int, float)):
+        data['duration_per_image'] = duration_per_image
+    
+    if data.get('transition_duration') is None:
+        return None
+    transition_duration = _parse_seconds(data['transition_duration'])
+    if transition_duration is None or transition_duration < 0:
+        return '"transition_duration" deve ser um número não negativo (segundos)'
+    data['transition_duration'] = min(transition_duration, duration_per_image / 2)
+    return None
+
+
+def _run_video_generation(data):
+    """
+    Cria os frames do slideshow e os metadados a partir dos dados da requisição
+    """
+    images_data = data.get('images', [])
+    duration_per_image = data.get('duration_per_image', 3)
+    title = data.get('title', 'Vídeo')
+    description = data.get('description', '')
+    
+    # Cria frames do slideshow
+    result = video_service.create_slideshow_frames(
+        images_data,
+        duration_per_image,
+        frame_format=data.get('frame_format') or 'png',
+        quality=data.get('quality')
+    )
+    
+    if result['success']:
+        # Adiciona metadados
+        metadata = video_service.create_video_metadata(
+            title,
+            description,
+            result['total_frames'],
+            result['total_duration']
+        )
+        result['metadata'] = metadata
+    
+    return result
+
+
+def _export_video_mp4(data):
+    """
+    Codifica o slideshow em MP4, guarda no ArtifactStore (com histórico)
+    e envia o arquivo ao cliente
+    """
+    params_hash = history_service.params_hash('video', {
+        field: data.get(field)
+        for field in ('images', 'duration_per_image', 'transition', 'transition_duration', 'ken_burns')
+    })
+    artifact = None if data.get('bypass_cache') else history_service.find('video', params_hash)
+    # O arquivo pode ter sido removido do ArtifactStore depois da consulta
+    video = artifact_store.path_for(artifact['name']) if artifact else None
+    
+    if video is None:
+        result = video_service.export_mp4(
+            data.get('images', []),
+            data.get('duration_per_image', 3),
+            transition=data.get('transition'),
+            transition_duration=data.get('transition_duration'),
+            ken_burns=bool(data.get('ken_burns', False))
+        )
+        if not result['success']:
+            return jsonify(result), 500
+        
+        try:
+            with open(result['path'], 'rb') as video_file:
+                artifact = artifact_store.put_file(video_file, 'video/mp4')
+            video = artifact_store.path_for(artifact['name'])
+            if video is None:
+                # Maior que o limite do ArtifactStore: envia o arquivo
+                # temporário (continua legível depois de removido)
+                video = open(result['path'], 'rb')
+        finally:
+            os.remove(result['path'])
+        history_service.record('video', artifact, params_hash, data.get('owner'))
+    
+    title = data.get('title', 'Vídeo')
+    response = send_file(
+        video,
+        mimetype='video/mp4',
+        as_attachment=True,
+        download_name=f'{title.replace(" ", "_")}.mp4',
+        conditional=True,
+        etag=artifact['id']
+    )
+    if isinstance(video, str):
+        response.headers['X-Artifact-Url'] = artifact['url']
+    return response
+
+
+def _stream_file(fileobj, size, mimetype, filename, chunk_size=64 * 1024):
+    """
+    Transmite um arquivo temporário em blocos e o fecha ao final
+    """
+    def generate():
+        try:
+            for chunk in iter(lambda: fileobj.read(chunk_size), b''):
+                yield chunk
+        finally:
+            fileobj.close()
+    
+    response = Response(generate(), mimetype=mimetype, direct_passthrough=True)
+    response.content_length = size
+    response.headers.set('Content-Disposition', 'attachment', **_disposition_filename(filename))
+    return response
+
+
+def _disposition_filename(filename):
+    """
+    Parâmetros de nome de arquivo do Content-Disposition, como no send_file:
+    nomes fora do ASCII (títulos acentuados) vão em filename* (RFC 5987),
+    com uma versão ASCII em filename; aspas são escapadas pelo Werkzeug
+    """
+    # Quebras de linha e outros caracteres de controle não podem ir no cabeçalho
+    filename = ''.join(char if char.isprintable() else '_' for char in filename)
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+^`|~')}"}
+    return {'filename': filename}
+
+
+def _submit_job(kind, func, data):
+    """
+    Enfileira uma geração e responde com o job_id
+    """
+    # Os jobs rodam em outra thread: precisam do app context para o histórico
+    app = current_app._get_current_object()
+    
+    def run(data):
+        with app.app_context():
+            return func(data)
+    
+    result = job_service.submit(kind, run, data)
+    if not result['success']:
+        status_code = 503 if result.get('status') == 'queue_full' else 500
+        return jsonify(result), status_code
+    
+    result['status_url'] = f"{request.script_root}/api/jobs/{result['job_id']}"
+    return jsonify(result), 202
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Endpoint de status/resultado de um job
+    
+    Use ?wait=N para aguardar até N segundos pelo término (long-poll)
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Parâmetro wait inválido'
+        }), 400
+    
+    if wait > 0:
+        job = job_service.wait(job_id, wait)
+    else:
+        job = job_service.get(job_id)
+    
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job não encontrado ou expirado'
+        }), 404
+    
+    job['success'] = True
+    return jsonify(job), 200
+
+
+@api_bp.route('/history', methods=['GET'])
+def get_history():
+    """
+    Endpoint com o histórico de conteúdos gerados (mais recentes primeiro)
+    
+    Filtros: ?owner=, ?kind= (image, presentation, video); paginação com
+    ?limit= e ?before=<id da última entrada recebida>.
+    """
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    items = history_service.list(
+        owner=request.args.get('owner'),
+        kind=request.args.get('kind'),
+        limit=limit,
+        before_id=request.args.get('before', type=int)
+    )
+    return jsonify({
+        'success': True,
+        'items': items,
+        'count': len(items),
+        'next_before': items[-1]['id'] if len(items) == limit else None
+    }), 200
+
+
+@api_bp.route('/artifacts/<name>', methods=['GET'])
+def get_artifact(name):
+    """
+    Endpoint de download de artefatos gerados
+    
+    Suporta ETag/If-None-Match e requisições Range. Use ?download=nome.ext
+    para forçar o download com um nome de arquivo.
+    """
+    path = artifact_store.path_for(name)
+    if path is None:
+        return jsonify({
+            'success': False,
+            'error': 'Artefato não encontrado'
+        }), 404
+    
+    etag = name.split('.', 1)[0]
+    if request.if_none_match.contains(etag):
+        # O cliente já tem este conteúdo: responde sem abrir o arquivo
+        response = Response(status=304)
+        response.set_etag(etag)
+    else:
+        download_name = request.args.get('download')
+        response = send_file(
+            path,
+            mimetype=artifact_store.mime_type_for(name),
+            as_attachment=bool(download_name),
+            download_name=download_name,
+            conditional=True,
+            etag=etag,
+            max_age=31536000
+        )
+    # O conteúdo nunca muda para o mesmo nome (hash)
+    response.cache_control.max_age = 31536000
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Endpoint de métricas no formato de texto do Prometheus
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@api_bp.route('/startup', methods=['GET'])
+def get_startup_report():
+    """
+    Endpoint com o tempo de inicialização por etapa e por serviço
+    """
+    return jsonify(startup_report()), 200
+
+
 @api_bp.route('/health', methods=['GET'])
 def health():
     """
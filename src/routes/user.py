@@ -1,12 +1,52 @@
-from flask import Blueprint, jsonify, request
+import hashlib
+import json
+from flask import Blueprint, Response, jsonify, request
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
 
 user_bp = Blueprint('user', __name__)
 
+USER_FIELDS = ('id', 'username', 'email')
+USERS_PAGE_DEFAULT = 50
+USERS_PAGE_MAX = 200
+USERS_BULK_MAX = 1000
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    # Paginação por cursor: ?after=<último id recebido>&limit=N&fields=id,username
+    limit = max(1, min(request.args.get('limit', USERS_PAGE_DEFAULT, type=int), USERS_PAGE_MAX))
+    after = request.args.get('after', 0, type=int)
+    fields = [f.strip() for f in request.args.get('fields', ','.join(USER_FIELDS)).split(',') if f.strip()]
+    invalid = [f for f in fields if f not in USER_FIELDS]
+    if invalid or not fields:
+        return jsonify({'error': f'Campos inválidos: {", ".join(invalid) or "(vazio)"}'}), 400
+
+    # O id é sempre lido (cursor), mesmo quando não foi pedido
+    names = ['id'] + [f for f in fields if f != 'id']
+    rows = db.session.execute(
+        db.select(*[getattr(User, name) for name in names])
+        .where(User.id > after).order_by(User.id).limit(limit + 1)
+    ).all()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    users = [
+        {name: value for name, value in zip(names, row) if name in fields}
+        for row in rows[:limit]
+    ]
+
+    # ETag da página: max(id) e total da tabela mais o conteúdo da página
+    # (edições não alteram max/total, então a página também entra no hash)
+    max_id, count = db.session.execute(db.select(db.func.max(User.id), db.func.count(User.id))).one()
+    body = json.dumps(users, sort_keys=True)
+    etag = hashlib.sha256(f'{max_id}:{count}:{next_cursor}:{body}'.encode()).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(users)
+    response.set_etag(etag)
+    response.headers['X-Total-Count'] = str(count)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -17,6 +57,65 @@ def create_user():
     db.session.commit()
     return jsonify(user.to_dict()), 201
 
+@user_bp.route('/users/bulk', methods=['POST'])
+def create_users_bulk():
+    # Importação em lote: uma transação (executemany) e erros por linha
+    data = request.json
+    rows = data.get('users') if isinstance(data, dict) else data
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'error': 'Forneça uma lista de usuários em "users"'}), 400
+    if len(rows) > USERS_BULK_MAX:
+        return jsonify({'error': f'Máximo de {USERS_BULK_MAX} usuários por requisição'}), 400
+
+    errors = []
+    valid = []
+    seen = {'username': set(), 'email': set()}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict) or not all(isinstance(row.get(f), str) and row.get(f).strip()
+                                                for f in ('username', 'email')):
+            errors.append({'index': index, 'error': 'username e email são obrigatórios'})
+            continue
+        values = {'username': row['username'].strip(), 'email': row['email'].strip()}
+        duplicated = [f for f in ('username', 'email') if values[f] in seen[f]]
+        if duplicated:
+            errors.append({'index': index, 'error': f'{duplicated[0]} repetido no lote'})
+            continue
+        for f in ('username', 'email'):
+            seen[f].add(values[f])
+        valid.append((index, values))
+
+    # Conflitos com usuários existentes: uma consulta por coluna
+    existing = {
+        f: set(db.session.scalars(db.select(getattr(User, f)).where(getattr(User, f).in_(seen[f]))))
+        for f in ('username', 'email')
+    }
+    to_insert = []
+    for index, values in valid:
+        conflict = next((f for f in ('username', 'email') if values[f] in existing[f]), None)
+        if conflict:
+            errors.append({'index': index, 'error': f'{conflict} já cadastrado'})
+        else:
+            to_insert.append(values)
+
+    if to_insert:
+        try:
+            db.session.execute(db.insert(User), to_insert)
+            db.session.commit()
+        except IntegrityError:
+            # Outro processo inseriu os mesmos dados entre a validação e o insert
+            db.session.rollback()
+            return jsonify({'error': 'Conflito ao inserir o lote; nenhum usuário foi criado'}), 409
+
+    created = db.session.scalars(
+        db.select(User).where(User.username.in_([values['username'] for values in to_insert])).order_by(User.id)
+    ).all() if to_insert else []
+    errors.sort(key=lambda error: error['index'])
+    status = 201 if not errors else (207 if created else 400)
+    return jsonify({
+        'created': [user.to_dict() for user in created],
+        'errors': errors
+    }), status
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -0,0 +1,125 @@
+"""
+Armazenamento de artefatos gerados (imagens, apresentações) por hash de conteúdo
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+
+MIME_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp',
+    'video/mp4': 'mp4',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'pptx',
+}
+EXTENSION_MIMES = {ext: mime for mime, ext in MIME_EXTENSIONS.items()}
+
+_NAME_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+
+
+class ArtifactStore:
+    """
+    Guarda bytes em disco sob o sha256 do conteúdo. O diretório é
+    compartilhado entre os workers e limitado por tamanho total.
+    """
+
+    def __init__(self, base_dir=None, max_bytes=None, url_prefix='/api/artifacts'):
+        self.base_dir = base_dir or os.getenv('ARTIFACT_DIR') or os.path.join(
+            tempfile.gettempdir(), 'ai_content_studio', 'artifacts'
+        )
+        self.max_bytes = max_bytes or int(os.getenv('ARTIFACT_MAX_BYTES', str(1024 * 1024 * 1024)))
+        self.url_prefix = url_prefix
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def put(self, data, mime_type):
+        """
+        Armazena os bytes (ou memoryview) e retorna a descrição do artefato
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        name = f'{digest}.{MIME_EXTENSIONS[mime_type]}'
+        path = os.path.join(self.base_dir, name)
+
+        if os.path.exists(path):
+            os.utime(path, None)
+        else:
+            # Escrita atômica: o nome final só aparece com o conteúdo completo
+            fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._evict()
+
+        return self.describe(name, len(data))
+
+    def put_file(self, fileobj, mime_type, chunk_size=1024 * 1024):
+        """
+        Armazena o conteúdo de um arquivo aberto, lendo em blocos
+        (o conteúdo nunca fica inteiro em memória)
+        """
+        fileobj.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: fileobj.read(chunk_size), b''):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            name = f'{digest.hexdigest()}.{MIME_EXTENSIONS[mime_type]}'
+            os.replace(tmp_path, os.path.join(self.base_dir, name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+        return self.describe(name, size)
+
+    def describe(self, name, size):
+        digest, ext = name.split('.', 1)
+        return {
+            'id': digest,
+            'name': name,
+            'url': f'{self.url_prefix}/{name}',
+            'mime_type': EXTENSION_MIMES[ext],
+            'size': size
+        }
+
+    def path_for(self, name):
+        """
+        Caminho do artefato, ou None se o nome for inválido ou não existir
+        """
+        if not _NAME_RE.match(name) or name.rsplit('.', 1)[1] not in EXTENSION_MIMES:
+            return None
+        path = os.path.join(self.base_dir, name)
+        return path if os.path.exists(path) else None
+
+    def mime_type_for(self, name):
+        return EXTENSION_MIMES[name.rsplit('.', 1)[1]]
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.base_dir) as it:
+            for entry in it:
+                if not _NAME_RE.match(entry.name):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,282 @@
+"""
+Variantes assíncronas dos serviços que dependem de chamadas externas
+
+Um único event loop por processo, em uma thread própria, atende todas as
+chamadas em andamento. As threads das requisições (worker gthread do
+gunicorn) apenas aguardam o resultado; centenas de requisições esperando o
+upstream compartilham o mesmo loop e o mesmo pool de conexões.
+
+Os serviços síncronos continuam disponíveis: estas classes envolvem uma
+instância existente e compartilham com ela caches, limitador de taxa e
+configuração.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from src.services.metrics_service import metrics
+
+
+class EventLoopRunner:
+    """
+    Event loop em uma thread de fundo, criado no primeiro uso (depois do
+    fork dos workers do gunicorn)
+
+    O trabalho bloqueante (cache em disco, codificação de imagens) roda no
+    executor padrão do loop, dimensionado pelo número de threads do worker
+    (o padrão do asyncio, min(32, cpus + 4), fica com ~5 threads em uma
+    máquina de 1 CPU). As pesquisas, que podem passar do prazo e continuar
+    ocupando a thread, têm um executor próprio e limitado.
+    """
+
+    def __init__(self, max_workers=None, search_workers=None):
+        self.max_workers = max_workers or int(
+            os.getenv('UPSTREAM_EXECUTOR_THREADS') or os.getenv('GUNICORN_THREADS') or '32'
+        )
+        self.search_workers = search_workers or int(os.getenv('SEARCH_EXECUTOR_THREADS', '8'))
+        self._loop = None
+        self._search_executor = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def run(self, coro, timeout=None):
+        """
+        Executa a corrotina no loop e espera o resultado (chamável de qualquer thread)
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result(timeout)
+
+    async def run_blocking(self, func, *args):
+        """
+        Executa a função bloqueante no executor padrão do loop
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def run_search(self, func, *args):
+        """
+        Executa a pesquisa bloqueante no executor reservado às pesquisas
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._search_executor, func, *args)
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(
+                    ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='upstream-blocking')
+                )
+                self._search_executor = ThreadPoolExecutor(
+                    max_workers=self.search_workers, thread_name_prefix='upstream-search'
+                )
+                thread = threading.Thread(target=loop.run_forever, name='upstream-loop', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _reset(self):
+        self._loop = None
+        self._search_executor = None
+        self._lock = threading.Lock()
+
+
+# Loop compartilhado pelo processo
+runner = EventLoopRunner()
+
+
+class AsyncImageService:
+    """
+    Geração de imagens com chamadas assíncronas ao Hugging Face (httpx)
+
+    Mesma política do ImageService: cache, limitador de taxa adaptativo,
+    novas tentativas dentro do orçamento de latência e fallback de formato.
+    """
+
+    def __init__(self, image_service, max_connections=None):
+        self.image_service = image_service
+        self.max_connections = max_connections or int(os.getenv('HF_ASYNC_MAX_CONNECTIONS', '100'))
+        self._client = None
+
+    async def generate_image(self, prompt, negative_prompt="", num_inference_steps=25, use_cache=True,
+                             output='inline', image_format=None, quality=None, thumbnail=None):
+        """
+        Versão assíncrona de ImageService.generate_image (mesmo resultado)
+        """
+        service = self.image_service
+        cache_key = service._cache_key(prompt, negative_prompt, num_inference_steps)
+        options = {'image_format': image_format, 'quality': quality, 'thumbnail': thumbnail}
+        # Cache em disco e conversões de formato rodam fora do loop
+        if use_cache:
+            cached = await runner.run_blocking(service._cached_result, cache_key, output, options)
+            if cached is not None:
+                return cached
+
+        result = await self._request_image(prompt, negative_prompt, num_inference_steps)
+        return await runner.run_blocking(service._store_result, cache_key, result, output, options)
+
+    async def generate_images(self, items, max_concurrency=None, use_cache=True, output='inline',
+                              image_format=None, quality=None, thumbnail=None):
+        """
+        Versão assíncrona de ImageService.generate_images: a concorrência é
+        limitada por um semáforo em vez de um pool de threads
+        """
+        concurrency = max(1, min(max_concurrency or self.image_service.batch_concurrency, len(items) or 1))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(item):
+            async with semaphore:
+                try:
+                    return await self.generate_image(
+                        item['prompt'],
+                        item.get('negative_prompt', ''),
+                        item.get('num_inference_steps', 25),
+                        use_cache=use_cache,
+                        output=output,
+                        image_format=image_format,
+                        quality=quality,
+                        thumbnail=thumbnail
+                    )
+                except Exception as e:
+                    return {
+                        'success': False,
+                        'error': str(e),
+                        'status': 'error'
+                    }
+
+        return list(await asyncio.gather(*(run(item) for item in items)))
+
+    async def _request_image(self, prompt, negative_prompt, num_inference_steps):
+        service = self.image_service
+        payload = service._payload(prompt, negative_prompt, num_inference_steps)
+        deadline = time.monotonic() + service.latency_budget
+        attempt = 0
+
+        while True:
+            if not await self._acquire(deadline):
+                return {
+                    'success': False,
+                    'error': 'Limite de requisições atingido. Por favor, aguarde alguns minutos.',
+                    'status': 'rate_limited',
+                    'attempts': attempt
+                }
+            try:
+                response = await self._post(payload, deadline)
+                if response.status_code == 429:
+                    service.rate_limiter.on_throttle()
+                elif response.status_code == 200:
+                    service.rate_limiter.on_success()
+                failure = service._check_response(response)
+                if failure is None:
+                    return await runner.run_blocking(service._encode_image, response)
+                retry_after = service._retry_delay(response, attempt)
+            except httpx.TimeoutException:
+                failure = {
+                    'success': False,
+                    'error': 'Timeout na requisição. O modelo pode estar sobrecarregado.',
+                    'status': 'timeout'
+                }
+                retry_after = service._backoff(attempt)
+            except httpx.TransportError as e:
+                failure = {
+                    'success': False,
+                    'error': str(e),
+                    'status': 'error'
+                }
+                retry_after = service._backoff(attempt)
+            except Exception as e:
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'status': 'error'
+                }
+
+            # Só tenta de novo se o erro for transitório e houver orçamento
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            if retry_after is None or attempt > service.max_retries or retry_after >= remaining:
+                failure['attempts'] = attempt
+                return failure
+            await asyncio.sleep(retry_after)
+
+    async def _acquire(self, deadline):
+        """
+        Espera um token do limitador sem bloquear o loop
+        """
+        while True:
+            wait = self.image_service.rate_limiter.try_acquire()
+            if wait == 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(wait, remaining))
+
+    async def _post(self, payload, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise httpx.TimeoutException('Orçamento de latência esgotado')
+        client = self._get_client()
+        with metrics.upstream('huggingface'):
+            response = await client.post(
+                self.image_service.api_url,
+                json=payload,
+                timeout=min(self.image_service.request_timeout, remaining)
+            )
+        if response.status_code != 200:
+            metrics.inc('upstream_request_errors_total', upstream='huggingface')
+        return response
+
+    def _get_client(self):
+        # Criado dentro do loop que vai usá-lo (o do EventLoopRunner)
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.image_service.headers,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+
+class AsyncSearchService:
+    """
+    Pesquisa combinada assíncrona
+
+    duckduckgo_search e wikipediaapi não têm API assíncrona; as consultas
+    (com os caches do SearchService) rodam no executor de pesquisas do
+    runner, e o prazo total é controlado pelo loop.
+    """
+
+    def __init__(self, search_service):
+        self.search_service = search_service
+
+    async def search_web(self, query, max_results=5):
+        return await runner.run_search(self.search_service.search_web, query, max_results)
+
+    async def search_wikipedia(self, query):
+        return await runner.run_search(self.search_service.search_wikipedia, query)
+
+    async def combined_search(self, query, max_web_results=5, deadline=None):
+        """
+        Versão assíncrona de SearchService.combined_search (mesmo resultado)
+        """
+        service = self.search_service
+        deadline = service.deadline if deadline is None else deadline
+        start = time.perf_counter()
+
+        tasks = {
+            'web': asyncio.ensure_future(
+                runner.run_search(service._timed, service.search_web, query, max_web_results)
+            ),
+            'wikipedia': asyncio.ensure_future(
+                runner.run_search(service._timed, service.search_wikipedia, query)
+            )
+        }
+        await asyncio.wait(tasks.values(), timeout=deadline)
+
+        outcomes = {
+            source: task.result() if task.done() else None
+            for source, task in tasks.items()
+        }
+        return service._combine_results(query, outcomes, start)
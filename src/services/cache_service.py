@@ -0,0 +1,304 @@
+"""
+Caches de resultados: duas camadas (memória + disco) e TTL em memória
+"""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(*parts):
+    """
+    Gera uma chave estável (sha256) a partir das partes fornecidas
+    """
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache endereçado por conteúdo com uma camada LRU em memória (por processo)
+    e uma camada em disco limitada por tamanho, compartilhada entre os workers
+    do gunicorn. Os valores armazenados são bytes.
+
+    A camada em memória é limitada por número de entradas e, opcionalmente,
+    pelo total de bytes (max_memory_bytes).
+    """
+
+    def __init__(self, name, max_entries=64, disk_dir=None, max_disk_bytes=256 * 1024 * 1024,
+                 max_memory_bytes=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = disk_dir
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+        }
+
+    def get(self, key):
+        """
+        Retorna o valor armazenado ou None
+        """
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return value
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._store_memory(key, value)
+        return value
+
+    def set(self, key, value):
+        """
+        Armazena o valor nas duas camadas
+        """
+        with self._lock:
+            self._store_memory(key, value)
+        self._write_disk(key, value)
+
+    def clear(self):
+        """
+        Remove todas as entradas (memória e disco)
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.disk_dir:
+            for entry in self._disk_entries():
+                self._remove(entry[2])
+
+    def stats(self):
+        """
+        Retorna contadores de acertos, falhas e ocupação
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        if self.disk_dir:
+            entries = self._disk_entries()
+            stats['disk_entries'] = len(entries)
+            stats['disk_bytes'] = sum(size for _, size, _ in entries)
+        stats['name'] = self.name
+        return stats
+
+    def _store_memory(self, key, value):
+        if self.max_memory_bytes is not None and len(value) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = value
+        self._memory_bytes += len(value)
+        while len(self._memory) > self.max_entries or (
+            self.max_memory_bytes is not None and self._memory_bytes > self.max_memory_bytes
+        ):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats['memory_evictions'] += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.bin')
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            # Atualiza mtime para que a evicção no disco se comporte como LRU
+            os.utime(path, None)
+            return value
+        except OSError:
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir or len(value) > self.max_disk_bytes:
+            return
+        try:
+            # Escrita atômica: outro worker nunca lê um arquivo pela metade
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _disk_entries(self):
+        entries = []
+        try:
+            with os.scandir(self.disk_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith('.bin'):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def _evict_disk(self):
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_disk_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                with self._lock:
+                    self._stats['disk_evictions'] += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+class TTLCache:
+    """
+    Cache em memória com expiração (TTL) e stale-while-revalidate: após o TTL,
+    a entrada antiga continua sendo servida enquanto uma atualização roda em
+    segundo plano, até o limite de stale_ttl.
+
+    Limitado por número de entradas e, opcionalmente, pelo total de bytes
+    (max_bytes); o tamanho de cada valor é o do JSON correspondente.
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, max_entries=1024, max_bytes=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'evictions': 0,
+        }
+
+    def get_or_load(self, key, loader, executor=None, should_cache=None):
+        """
+        Retorna o valor em cache ou chama loader() para obtê-lo
+
+        Args:
+            key: Chave da entrada
+            loader: Função sem argumentos que produz o valor
+            executor: Executor usado para as atualizações em segundo plano
+                (sem executor, entradas expiradas são recarregadas na hora)
+            should_cache: Predicado que decide se um valor pode ser armazenado
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at, _ = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return copy.copy(value)
+                if executor is not None and age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        executor.submit(self._refresh, key, loader, should_cache)
+                    return copy.copy(value)
+            self._stats['misses'] += 1
+
+        value = loader()
+        self._store(key, value, should_cache)
+        return copy.copy(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Retorna contadores de acertos, falhas e ocupação
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        stats['name'] = self.name
+        return stats
+
+    def _refresh(self, key, loader, should_cache):
+        try:
+            value = loader()
+            self._store(key, value, should_cache)
+            with self._lock:
+                self._stats['refreshes'] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, should_cache):
+        if should_cache is not None and not should_cache(value):
+            return
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, time.monotonic(), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self._stats['evictions'] += 1
+
+    @staticmethod
+    def _sizeof(value):
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
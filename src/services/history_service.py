@@ -0,0 +1,119 @@
+"""
+Histórico de conteúdos gerados e reaproveitamento por parâmetros
+"""
+from datetime import datetime, timedelta
+
+from src.models.artifact import GeneratedArtifact, db
+from src.services.cache_service import make_cache_key
+
+
+class HistoryService:
+    """
+    Registra os artefatos gerados na tabela generated_artifact (app.db) e
+    encontra um resultado anterior para os mesmos parâmetros.
+
+    Precisa de um app context do Flask (rotas e jobs da API já têm um).
+    """
+
+    def __init__(self, artifact_store):
+        self.artifact_store = artifact_store
+
+    @staticmethod
+    def params_hash(kind, params):
+        """
+        Hash estável dos parâmetros que determinam o conteúdo gerado
+        """
+        return make_cache_key('history', kind, params)
+
+    def find(self, kind, params_hash, max_age=None):
+        """
+        Artefato mais recente gerado com estes parâmetros, ou None
+
+        Com max_age (segundos), entradas mais antigas não são reaproveitadas.
+        Entradas cujo arquivo já foi removido do ArtifactStore (evicção por
+        tamanho) são apagadas do histórico.
+        """
+        try:
+            query = GeneratedArtifact.query.filter_by(params_hash=params_hash, kind=kind)
+            if max_age is not None:
+                query = query.filter(GeneratedArtifact.created_at >= datetime.utcnow() - timedelta(seconds=max_age))
+            entries = (
+                query
+                .order_by(GeneratedArtifact.created_at.desc())
+                .limit(5)
+                .all()
+            )
+        except Exception:
+            return None
+        found = None
+        stale = []
+        for entry in entries:
+            if self.artifact_store.path_for(entry.name) is None:
+                stale.append(entry)
+            else:
+                found = self.artifact_store.describe(entry.name, entry.size)
+                break
+        if stale:
+            self._delete(stale)
+        return found
+
+    def record(self, kind, artifact, params_hash, owner=None):
+        """
+        Registra um artefato gerado; falhas no histórico não afetam a geração
+
+        Artefatos que o ArtifactStore não manteve (maiores que o limite) não
+        são registrados.
+        """
+        if self.artifact_store.path_for(artifact['name']) is None:
+            return None
+        try:
+            entry = GeneratedArtifact(
+                content_hash=artifact['id'],
+                name=artifact['name'],
+                kind=kind,
+                owner=owner,
+                params_hash=params_hash,
+                mime_type=artifact['mime_type'],
+                size=artifact['size']
+            )
+            db.session.add(entry)
+            db.session.commit()
+            return entry.to_dict()
+        except Exception:
+            db.session.rollback()
+            return None
+
+    @staticmethod
+    def _delete(entries):
+        try:
+            for entry in entries:
+                db.session.delete(entry)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+    def list(self, owner=None, kind=None, limit=20, before_id=None):
+        """
+        Histórico mais recente primeiro; before_id pagina a partir de uma entrada
+        """
+        query = GeneratedArtifact.query
+        if owner is not None:
+            query = query.filter_by(owner=owner)
+        if kind is not None:
+            query = query.filter_by(kind=kind)
+        if before_id is not None:
+            before = db.session.get(GeneratedArtifact, before_id)
+            if before is not None:
+                query = query.filter(db.or_(
+                    GeneratedArtifact.created_at < before.created_at,
+                    db.and_(GeneratedArtifact.created_at == before.created_at, GeneratedArtifact.id < before.id)
+                ))
+        entries = query.order_by(GeneratedArtifact.created_at.desc(), GeneratedArtifact.id.desc()).limit(limit).all()
+
+        items = []
+        for entry in entries:
+            item = entry.to_dict()
+            item['url'] = self.artifact_store.describe(entry.name, entry.size)['url']
+            item['available'] = self.artifact_store.path_for(entry.name) is not None
+            items.append(item)
+        return items
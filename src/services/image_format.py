@@ -0,0 +1,100 @@
+"""
+Formatos de saída de imagem: detecção, codificação e variantes (miniaturas)
+"""
+from io import BytesIO
+
+from src.services.metrics_service import metrics
+
+
+# formato: (tipo MIME, nome no PIL)
+IMAGE_FORMATS = {
+    'png': ('image/png', 'PNG'),
+    'jpeg': ('image/jpeg', 'JPEG'),
+    'webp': ('image/webp', 'WEBP'),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+DEFAULT_QUALITY = {'jpeg': 85, 'webp': 80}
+
+
+def normalize_format(image_format):
+    """
+    Nome canônico do formato ('jpg' -> 'jpeg'); None significa manter o original
+    """
+    if image_format is None:
+        return None
+    image_format = FORMAT_ALIASES.get(str(image_format).lower(), str(image_format).lower())
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f'Formato de imagem não suportado: {image_format}')
+    return image_format
+
+
+def normalize_quality(image_format, quality):
+    """
+    Qualidade efetiva (1-100) para formatos com perdas; None para PNG
+    """
+    if image_format not in DEFAULT_QUALITY:
+        return None
+    if quality is None:
+        return DEFAULT_QUALITY[image_format]
+    return max(1, min(100, int(quality)))
+
+
+def sniff_format(data):
+    """
+    Formato dos bytes pela assinatura do arquivo (None se desconhecido)
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def encode_image(img, image_format='png', quality=None):
+    """
+    Codifica uma imagem do PIL no formato pedido e retorna os bytes
+    """
+    image_format = normalize_format(image_format) or 'png'
+    quality = normalize_quality(image_format, quality)
+    params = {}
+    if quality is not None:
+        params['quality'] = quality
+    if image_format == 'jpeg' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    buffered = BytesIO()
+    operation = f'{image_format}_encode'
+    with metrics.timer('operation_duration_seconds', operation=operation):
+        img.save(buffered, format=IMAGE_FORMATS[image_format][1], **params)
+    metrics.observe('operation_output_bytes', buffered.tell(), operation=operation)
+    return buffered.getvalue()
+
+
+def transcode(data, image_format=None, quality=None, max_size=None):
+    """
+    Converte os bytes para o formato/tamanho pedido
+
+    Sem conversão necessária (mesmo formato, sem redução), os bytes
+    originais são retornados sem decodificar.
+
+    Returns:
+        (bytes, formato, (largura, altura))
+    """
+    from PIL import Image
+
+    source_format = sniff_format(data)
+    target_format = normalize_format(image_format) or source_format or 'png'
+
+    img = Image.open(BytesIO(data))
+    needs_resize = max_size is not None and max(img.size) > max_size
+    if target_format == source_format and not needs_resize and quality is None:
+        # Apenas o cabeçalho foi lido
+        return data, source_format, img.size
+
+    img.load()
+    if needs_resize:
+        img = img.copy()
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+    return encode_image(img, target_format, quality), target_format, img.size
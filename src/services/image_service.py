@@ -2,84 +2,361 @@
 Serviço de geração de imagens usando Hugging Face
 """
 import os
+import random
+import tempfile
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import base64
 from io import BytesIO
 from PIL import Image
+import hashlib
+import threading
 import time
+from src.services.artifact_service import ArtifactStore
+from src.services.cache_service import ResultCache, make_cache_key
+from src.services.image_format import (
+    IMAGE_FORMATS, encode_image, normalize_format, normalize_quality, sniff_format, transcode
+)
+from src.services.metrics_service import metrics
+from src.services.rate_limiter import TokenBucket
+from src.services.text_layout import FONT_REGULAR, get_font, draw_centered_text
+
+
+# Estilos disponíveis para generate_simple_placeholder
+PLACEHOLDER_STYLES = {
+    'default': {'background': (73, 109, 137), 'color': (255, 255, 255), 'font_size': 24},
+    'dark': {'background': (30, 30, 30), 'color': (220, 220, 220), 'font_size': 24},
+    'light': {'background': (235, 235, 235), 'color': (60, 60, 60), 'font_size': 24},
+}
 
 
 class ImageService:
-    def __init__(self, hf_token=None):
+    def __init__(self, hf_token=None, artifact_store=None):
         self.hf_token = hf_token or os.getenv('HUGGINGFACE_TOKEN')
-        self.api_url = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-2-1"
+        self.api_url = os.getenv('HF_API_URL') or "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-2-1"
         self.headers = {}
         if self.hf_token:
             self.headers["Authorization"] = f"Bearer {self.hf_token}"
+        
+        # Destino das imagens no modo output='artifact'
+        self.artifact_store = artifact_store or ArtifactStore()
+        
+        # Cache de resultados (LRU em memória + disco compartilhado entre workers)
+        self.cache = ResultCache(
+            'image',
+            max_entries=int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', '64')),
+            disk_dir=os.getenv('IMAGE_CACHE_DIR') or os.path.join(
+                tempfile.gettempdir(), 'ai_content_studio', 'image_cache'
+            ),
+            max_disk_bytes=int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+        )
+        
+        # Placeholders já codificados (só memória, limitado por bytes): durante
+        # uma falha do Hugging Face o mesmo texto é pedido repetidamente
+        self.placeholder_cache = ResultCache(
+            'placeholder',
+            max_entries=int(os.getenv('PLACEHOLDER_CACHE_MAX_ENTRIES', '1024')),
+            max_memory_bytes=int(os.getenv('PLACEHOLDER_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+        )
+        
+        # Sessão HTTP persistente (keep-alive + pool de conexões)
+        pool_size = int(os.getenv('HF_POOL_SIZE', '10'))
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Política de novas tentativas dentro de um orçamento total de latência
+        self.request_timeout = 60
+        self.latency_budget = float(os.getenv('HF_LATENCY_BUDGET', '90'))
+        self.max_retries = int(os.getenv('HF_MAX_RETRIES', '3'))
+        self.backoff_base = 1.0
+        
+        # Limitador de taxa compartilhado por todas as chamadas deste processo;
+        # reduz a taxa quando o Hugging Face responde 429
+        self.rate_limiter = TokenBucket(
+            rate=float(os.getenv('HF_RATE_LIMIT', '2')),
+            capacity=int(os.getenv('HF_RATE_BURST', '4'))
+        )
+        self.batch_concurrency = int(os.getenv('HF_BATCH_CONCURRENCY', '4'))
+        
+        # Variantes (formato, qualidade, miniatura) são derivadas uma única vez
+        # por imagem de origem; ficam em um cache próprio para não disputar
+        # espaço (nem estatísticas) com os resultados do Hugging Face
+        self.variant_cache = ResultCache(
+            'image_variant',
+            max_entries=int(os.getenv('IMAGE_VARIANT_CACHE_MAX_ENTRIES', '128')),
+            disk_dir=os.getenv('IMAGE_VARIANT_CACHE_DIR') or os.path.join(
+                tempfile.gettempdir(), 'ai_content_studio', 'image_variants'
+            ),
+            max_disk_bytes=int(os.getenv('IMAGE_VARIANT_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+        )
+        self._variant_locks = [threading.Lock() for _ in range(16)]
     
-    def generate_image(self, prompt, negative_prompt="", num_inference_steps=25):
+    def generate_image(self, prompt, negative_prompt="", num_inference_steps=25, use_cache=True,
+                       output='inline', image_format=None, quality=None, thumbnail=None):
         """
         Gera uma imagem a partir de um prompt de texto
+        
+        Resultados bem-sucedidos são armazenados em cache (bytes do upstream)
+        pela combinação (modelo, prompt, negative_prompt, num_inference_steps).
+        Use use_cache=False para forçar uma nova geração.
+        
+        Com output='artifact', a imagem é gravada no ArtifactStore e o
+        resultado traz uma URL em vez do data URI base64.
+        
+        image_format ('png', 'jpeg', 'webp') e quality convertem a imagem;
+        sem eles, os bytes do upstream são repassados sem recodificação.
+        thumbnail (lado máximo em pixels) adiciona uma miniatura ao resultado.
         """
-        try:
-            payload = {
-                "inputs": prompt,
-                "parameters": {
-                    "negative_prompt": negative_prompt,
-                    "num_inference_steps": num_inference_steps
-                }
-            }
-            
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 503:
-                # Modelo está carregando
+        cache_key = self._cache_key(prompt, negative_prompt, num_inference_steps)
+        options = {'image_format': image_format, 'quality': quality, 'thumbnail': thumbnail}
+        if use_cache:
+            cached = self._cached_result(cache_key, output, options)
+            if cached is not None:
+                return cached
+        
+        result = self._request_image(prompt, negative_prompt, num_inference_steps)
+        return self._store_result(cache_key, result, output, options)
+    
+    def _cache_key(self, prompt, negative_prompt, num_inference_steps):
+        return make_cache_key(self.api_url, prompt, negative_prompt, num_inference_steps, 'raw')
+    
+    def _cached_result(self, cache_key, output, options):
+        """
+        Resultado a partir do cache, ou None
+        """
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        result = self._image_result(cached, output, **options)
+        result['cached'] = True
+        return result
+    
+    def _store_result(self, cache_key, result, output, options):
+        """
+        Guarda a resposta do upstream no cache e monta o resultado
+        """
+        if not result['success']:
+            return result
+        
+        self.cache.set(cache_key, result['content'])
+        result = self._image_result(result['content'], output, size=result['size'], **options)
+        result['cached'] = False
+        return result
+    
+    def generate_images(self, items, max_concurrency=None, use_cache=True, output='inline',
+                        image_format=None, quality=None, thumbnail=None):
+        """
+        Gera várias imagens em paralelo (concorrência limitada)
+        
+        Args:
+            items: Lista de dicionários com 'prompt' e, opcionalmente,
+                'negative_prompt' e 'num_inference_steps'
+            max_concurrency: Máximo de gerações simultâneas
+        
+        Returns:
+            Lista de resultados na mesma ordem dos itens
+        """
+        concurrency = max(1, min(max_concurrency or self.batch_concurrency, len(items) or 1))
+        
+        def run(item):
+            try:
+                return self.generate_image(
+                    item['prompt'],
+                    item.get('negative_prompt', ''),
+                    item.get('num_inference_steps', 25),
+                    use_cache=use_cache,
+                    output=output,
+                    image_format=image_format,
+                    quality=quality,
+                    thumbnail=thumbnail
+                )
+            except Exception as e:
                 return {
                     'success': False,
-                    'error': 'O modelo está carregando. Por favor, tente novamente em alguns segundos.',
-                    'status': 'loading'
+                    'error': str(e),
+                    'status': 'error'
                 }
-            
-            if response.status_code == 429:
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='image') as executor:
+            return list(executor.map(run, items))
+    
+    def cache_stats(self):
+        """
+        Retorna estatísticas do cache de imagens (e dos caches de placeholders
+        e de variantes)
+        """
+        stats = self.cache.stats()
+        stats['placeholder'] = self.placeholder_cache.stats()
+        stats['variant'] = self.variant_cache.stats()
+        return stats
+    
+    def _request_image(self, prompt, negative_prompt, num_inference_steps):
+        """
+        Faz a chamada à API do Hugging Face
+        """
+        payload = self._payload(prompt, negative_prompt, num_inference_steps)
+        deadline = time.monotonic() + self.latency_budget
+        attempt = 0
+        
+        while True:
+            if not self.rate_limiter.acquire(timeout=max(0, deadline - time.monotonic())):
                 return {
                     'success': False,
                     'error': 'Limite de requisições atingido. Por favor, aguarde alguns minutos.',
-                    'status': 'rate_limited'
+                    'status': 'rate_limited',
+                    'attempts': attempt
                 }
-            
-            if response.status_code != 200:
+            try:
+                response = self._post(payload, deadline)
+                if response.status_code == 429:
+                    self.rate_limiter.on_throttle()
+                elif response.status_code == 200:
+                    self.rate_limiter.on_success()
+                failure = self._check_response(response)
+                if failure is None:
+                    return self._encode_image(response)
+                retry_after = self._retry_delay(response, attempt)
+            except requests.exceptions.Timeout:
+                failure = {
+                    'success': False,
+                    'error': 'Timeout na requisição. O modelo pode estar sobrecarregado.',
+                    'status': 'timeout'
+                }
+                retry_after = self._backoff(attempt)
+            except requests.exceptions.ConnectionError as e:
+                failure = {
+                    'success': False,
+                    'error': str(e),
+                    'status': 'error'
+                }
+                retry_after = self._backoff(attempt)
+            except Exception as e:
                 return {
                     'success': False,
-                    'error': f'Erro na API: {response.status_code} - {response.text}',
+                    'error': str(e),
                     'status': 'error'
                 }
             
-            # Converte a resposta em imagem
-            image = Image.open(BytesIO(response.content))
-            
-            # Converte para base64 para enviar ao frontend
-            buffered = BytesIO()
-            image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            
+            # Só tenta de novo se o erro for transitório e houver orçamento
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            if retry_after is None or attempt > self.max_retries or retry_after >= remaining:
+                failure['attempts'] = attempt
+                return failure
+            time.sleep(retry_after)
+    
+    @staticmethod
+    def _payload(prompt, negative_prompt, num_inference_steps):
+        return {
+            "inputs": prompt,
+            "parameters": {
+                "negative_prompt": negative_prompt,
+                "num_inference_steps": num_inference_steps
+            }
+        }
+    
+    def _post(self, payload, deadline):
+        """
+        Envia a requisição respeitando o tempo restante do orçamento
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout()
+        with metrics.upstream('huggingface'):
+            response = self.session.post(
+                self.api_url,
+                json=payload,
+                timeout=min(self.request_timeout, remaining)
+            )
+        if response.status_code != 200:
+            metrics.inc('upstream_request_errors_total', upstream='huggingface')
+        return response
+    
+    def _check_response(self, response):
+        """
+        Retorna o dicionário de erro correspondente ao status, ou None se OK
+        """
+        if response.status_code == 503:
+            # Modelo está carregando
             return {
-                'success': True,
-                'image': f'data:image/png;base64,{img_str}',
-                'format': 'png',
-                'size': image.size
+                'success': False,
+                'error': 'O modelo está carregando. Por favor, tente novamente em alguns segundos.',
+                'status': 'loading'
             }
-            
-        except requests.exceptions.Timeout:
+        
+        if response.status_code == 429:
+            return {
+                'success': False,
+                'error': 'Limite de requisições atingido. Por favor, aguarde alguns minutos.',
+                'status': 'rate_limited'
+            }
+        
+        if response.status_code != 200:
             return {
                 'success': False,
-                'error': 'Timeout na requisição. O modelo pode estar sobrecarregado.',
-                'status': 'timeout'
+                'error': f'Erro na API: {response.status_code} - {response.text}',
+                'status': 'error'
+            }
+        
+        return None
+    
+    def _retry_delay(self, response, attempt):
+        """
+        Calcula a espera antes da próxima tentativa usando as dicas do
+        upstream (Retry-After, estimated_time). Retorna None se o erro
+        não for transitório.
+        """
+        if response.status_code not in (429, 502, 503, 504):
+            return None
+        
+        hint = None
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                hint = float(retry_after)
+            except ValueError:
+                hint = None
+        
+        if hint is None and response.status_code == 503:
+            try:
+                hint = float(response.json().get('estimated_time'))
+            except (ValueError, TypeError, AttributeError):
+                hint = None
+        
+        if hint is not None:
+            # Pequeno jitter para que os workers não acordem juntos
+            return hint + random.uniform(0, min(1.0, hint * 0.1))
+        return self._backoff(attempt)
+    
+    def _backoff(self, attempt):
+        """
+        Backoff exponencial com jitter completo
+        """
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+    
+    def _encode_image(self, response):
+        """
+        Valida a resposta da API; PNG, JPEG e WebP são mantidos como vieram,
+        outros formatos são convertidos para PNG
+        """
+        try:
+            content = response.content
+            if sniff_format(content) is None:
+                content, _, size = transcode(content, 'png')
+            else:
+                # Lê apenas o cabeçalho para validar e obter as dimensões
+                size = Image.open(BytesIO(content)).size
+            
+            return {
+                'success': True,
+                'content': content,
+                'size': size
             }
+            
         except Exception as e:
             return {
                 'success': False,
@@ -87,46 +364,115 @@ class ImageService:
                 'status': 'error'
             }
     
-    def generate_simple_placeholder(self, text, width=512, height=512):
+    def _image_result(self, data, output, size=None, image_format=None, quality=None, thumbnail=None):
+        """
+        Monta o resultado a partir dos bytes da imagem: data URI base64 ou
+        artefato, no formato pedido e com miniatura opcional
+        """
+        source = data
+        image_format = normalize_format(image_format)
+        if image_format is not None or quality is not None:
+            data, image_format, variant_size = self._variant(data, image_format, quality)
+            size = variant_size or size
+        else:
+            image_format = sniff_format(data)
+        
+        if size is None:
+            # Lê apenas o cabeçalho da imagem
+            size = Image.open(BytesIO(data)).size
+        
+        result = self._encode_output(data, image_format, output)
+        result.update({
+            'success': True,
+            'format': image_format,
+            'size': size
+        })
+        if thumbnail:
+            thumb_data, thumb_format, thumb_size = self._variant(source, image_format, quality, int(thumbnail))
+            result['thumbnail'] = self._encode_output(thumb_data, thumb_format, output)
+            result['thumbnail']['size'] = thumb_size
+        return result
+    
+    def _encode_output(self, data, image_format, output):
+        """
+        Publica os bytes como artefato ou monta o data URI
+        """
+        mime_type = IMAGE_FORMATS[image_format][0]
+        if output == 'artifact':
+            artifact = self.artifact_store.put(data, mime_type)
+            return {'artifact': artifact, 'url': artifact['url']}
+        img_str = base64.b64encode(data).decode()
+        return {'image': f'data:{mime_type};base64,{img_str}'}
+    
+    def _variant(self, data, image_format=None, quality=None, max_size=None):
+        """
+        Converte a imagem (formato, qualidade, miniatura) uma única vez por
+        origem: o resultado fica no cache de variantes, compartilhado entre
+        os workers. Sem conversão necessária, os bytes originais são
+        retornados como estão.
+        """
+        source_format = sniff_format(data)
+        image_format = normalize_format(image_format) or source_format or 'png'
+        size = None
+        if max_size is not None:
+            # Miniatura do tamanho da origem (ou maior) não reduz nada
+            size = Image.open(BytesIO(data)).size
+            if max(size) <= max_size:
+                max_size = None
+        if image_format == source_format and max_size is None and quality is None:
+            return data, image_format, size
+        
+        quality = normalize_quality(image_format, quality)
+        key = make_cache_key('variant', hashlib.sha256(data).hexdigest(), image_format, quality, max_size)
+        with self._variant_locks[int(key[:8], 16) % len(self._variant_locks)]:
+            variant = self.variant_cache.get(key)
+            if variant is None:
+                variant, _, size = transcode(data, image_format, quality, max_size)
+                self.variant_cache.set(key, variant)
+            else:
+                size = Image.open(BytesIO(variant)).size
+        return variant, image_format, size
+    
+    def generate_simple_placeholder(self, text, width=512, height=512, output='inline', style='default',
+                                    image_format=None, quality=None, thumbnail=None):
         """
         Gera uma imagem placeholder simples quando a API não está disponível
+        
+        O PNG é memorizado por (texto, largura, altura, estilo); a mesma
+        combinação é desenhada e codificada uma única vez por processo. No
+        modo artifact o nome (sha256) é estável e serve de ETag.
         """
         try:
-            from PIL import Image, ImageDraw, ImageFont
+            if style not in PLACEHOLDER_STYLES:
+                raise ValueError(f'Estilo de placeholder inválido: {style}')
             
-            # Cria imagem com gradiente
-            img = Image.new('RGB', (width, height), color=(73, 109, 137))
-            draw = ImageDraw.Draw(img)
+            cache_key = make_cache_key('placeholder', text, width, height, style)
+            png_bytes = self.placeholder_cache.get(cache_key)
+            if png_bytes is None:
+                png_bytes = self._render_placeholder(text, width, height, PLACEHOLDER_STYLES[style])
+                self.placeholder_cache.set(cache_key, png_bytes)
             
-            # Adiciona texto
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-            except:
-                font = ImageFont.load_default()
-            
-            # Centraliza texto
-            text_bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            position = ((width - text_width) // 2, (height - text_height) // 2)
-            
-            draw.text(position, text, fill=(255, 255, 255), font=font)
-            
-            # Converte para base64
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            
-            return {
-                'success': True,
-                'image': f'data:image/png;base64,{img_str}',
-                'format': 'png',
-                'size': (width, height),
-                'note': 'Imagem placeholder gerada localmente'
-            }
+            result = self._image_result(png_bytes, output, size=(width, height), image_format=image_format,
+                                        quality=quality, thumbnail=thumbnail)
+            result['note'] = 'Imagem placeholder gerada localmente'
+            return result
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
+    
+    def _render_placeholder(self, text, width, height, style):
+        """
+        Desenha o placeholder e retorna o PNG
+        """
+        from PIL import ImageDraw
+        
+        img = Image.new('RGB', (width, height), color=style['background'])
+        draw = ImageDraw.Draw(img)
+        
+        # Adiciona texto centralizado
+        font = get_font(FONT_REGULAR, style['font_size'])
+        draw_centered_text(draw, text, font, width, height, fill=style['color'])
+        return encode_image(img, 'png')
 
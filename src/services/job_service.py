@@ -0,0 +1,174 @@
+"""
+Fila de jobs assíncronos para gerações demoradas (imagens e vídeos)
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class JobService:
+    """
+    Executa jobs em um pool de threads limitado e persiste o estado em SQLite,
+    para que qualquer worker do gunicorn consiga responder a consultas de status.
+    """
+
+    def __init__(self, db_path=None, max_workers=None, max_queue=None, ttl=None):
+        self.db_path = db_path or os.getenv('JOB_DB_PATH') or os.path.join(
+            tempfile.gettempdir(), 'ai_content_studio', 'jobs.db'
+        )
+        self.max_workers = max_workers or int(os.getenv('JOB_WORKERS', '2'))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('JOB_QUEUE_SIZE', '16'))
+        self.ttl = ttl or int(os.getenv('JOB_TTL', '3600'))
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+        # Limita jobs em execução + enfileirados neste processo
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._events = {}
+        self._events_lock = threading.Lock()
+
+    def submit(self, kind, func, *args, **kwargs):
+        """
+        Enfileira uma função cujo retorno (dict) será o resultado do job
+        """
+        if not self._slots.acquire(blocking=False):
+            return {
+                'success': False,
+                'error': 'Fila de processamento cheia. Tente novamente em instantes.',
+                'status': 'queue_full'
+            }
+
+        self.cleanup()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, kind, 'queued', now, now)
+            )
+        with self._events_lock:
+            self._events[job_id] = threading.Event()
+
+        try:
+            self._executor.submit(self._run, job_id, func, args, kwargs)
+        except Exception as e:
+            self._slots.release()
+            self._finish(job_id, 'failed', error=str(e))
+            return {
+                'success': False,
+                'error': str(e),
+                'status': 'error'
+            }
+
+        return {
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued'
+        }
+
+    def get(self, job_id):
+        """
+        Retorna o estado do job, ou None se não existir (ou tiver expirado)
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT id, kind, status, result, error, created_at, updated_at FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        if row is None or row[5] < time.time() - self.ttl:
+            return None
+
+        job = {
+            'job_id': row[0],
+            'kind': row[1],
+            'status': row[2],
+            'created_at': row[5],
+            'updated_at': row[6]
+        }
+        if row[3] is not None:
+            job['result'] = json.loads(row[3])
+        if row[4] is not None:
+            job['error'] = row[4]
+        return job
+
+    def wait(self, job_id, timeout):
+        """
+        Long-poll: aguarda até o job terminar ou o tempo acabar
+        """
+        deadline = time.monotonic() + timeout
+        with self._events_lock:
+            event = self._events.get(job_id)
+
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in ('done', 'failed') or remaining <= 0:
+                return job
+            if event is not None:
+                # Job deste processo: acorda assim que terminar
+                event.wait(remaining)
+            else:
+                # Job de outro worker: consulta o banco periodicamente
+                time.sleep(min(0.25, remaining))
+
+    def cleanup(self):
+        """
+        Remove jobs expirados
+        """
+        with self._connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE created_at < ?', (time.time() - self.ttl,))
+
+    def _run(self, job_id, func, args, kwargs):
+        try:
+            self._update_status(job_id, 'running')
+            result = func(*args, **kwargs)
+            self._finish(job_id, 'done', result=result)
+        except Exception as e:
+            self._finish(job_id, 'failed', error=str(e))
+        finally:
+            self._slots.release()
+
+    def _update_status(self, job_id, status):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?',
+                (status, time.time(), job_id)
+            )
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?',
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+        with self._events_lock:
+            event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, '
+                'result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)')
@@ -0,0 +1,123 @@
+"""
+Carregamento sob demanda dos serviços e medição do tempo de inicialização
+"""
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Etapas da inicialização do app: [(nome, segundos)]
+STARTUP_STEPS = []
+_registry = []
+
+
+@contextmanager
+def startup_step(name):
+    """
+    Mede uma etapa da inicialização e a inclui no relatório
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_STEPS.append((name, time.perf_counter() - start))
+
+
+class LazyService:
+    """
+    Instancia o serviço (e importa o módulo dele, com as dependências
+    pesadas) apenas no primeiro acesso a um atributo.
+
+    O tempo de importação e o de construção ficam registrados para o
+    relatório de inicialização.
+
+    Os membros do proxy são todos privados (prefixo _): qualquer nome
+    público, como get, é repassado ao serviço.
+    """
+
+    def __init__(self, name, module_name, class_name, kwargs_factory=None):
+        self._name = name
+        self._module_name = module_name
+        self._class_name = class_name
+        self._kwargs_factory = kwargs_factory
+        self._instance = None
+        self._lock = threading.Lock()
+        self._import_seconds = None
+        self._init_seconds = None
+        _registry.append(self)
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        if attr.startswith('_'):
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self._resolve(), attr, value)
+
+    def _resolve(self):
+        """
+        Instância do serviço, criada no primeiro uso
+        """
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                module = self._load_module()
+                start = time.perf_counter()
+                kwargs = self._kwargs_factory() if self._kwargs_factory else {}
+                self._instance = getattr(module, self._class_name)(**kwargs)
+                self._init_seconds = time.perf_counter() - start
+            return self._instance
+
+    def _load_module(self):
+        """
+        Importa o módulo do serviço sem instanciá-lo (seguro antes do fork)
+        """
+        if self._import_seconds is None:
+            already_loaded = self._module_name in sys.modules
+            start = time.perf_counter()
+            module = importlib.import_module(self._module_name)
+            # Já importado por outro caminho: o custo foi pago em outra etapa
+            self._import_seconds = 0.0 if already_loaded else time.perf_counter() - start
+            return module
+        return importlib.import_module(self._module_name)
+
+    @property
+    def _loaded(self):
+        return self._instance is not None
+
+    def _describe(self):
+        return {
+            'name': self._name,
+            'module': self._module_name,
+            'loaded': self._loaded,
+            'import_ms': None if self._import_seconds is None else round(self._import_seconds * 1000, 2),
+            'init_ms': None if self._init_seconds is None else round(self._init_seconds * 1000, 2)
+        }
+
+
+def warm_up_modules():
+    """
+    Importa os módulos de todos os serviços registrados (sem instanciar)
+
+    Com o gunicorn --preload, isso roda no processo master e os workers
+    herdam os módulos já carregados; os serviços em si (threads, conexões,
+    pools) continuam sendo criados em cada worker, depois do fork.
+    """
+    for service in _registry:
+        service._load_module()
+
+
+def startup_report():
+    """
+    Tempo de cada etapa da inicialização e de cada serviço carregado
+    """
+    return {
+        'steps': [{'name': name, 'ms': round(seconds * 1000, 2)} for name, seconds in STARTUP_STEPS],
+        'total_ms': round(sum(seconds for _, seconds in STARTUP_STEPS) * 1000, 2),
+        'services': [service._describe() for service in _registry]
+    }
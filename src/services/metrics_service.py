@@ -0,0 +1,274 @@
+"""
+Métricas de latência, tamanho e erros no formato de texto do Prometheus
+
+Cada processo acumula as métricas em memória e grava periodicamente um
+snapshot em um diretório compartilhado; a rota de métricas soma os
+snapshots de todos os workers do gunicorn.
+
+O snapshot de um processo é apagado quando ele termina (atexit, ou o hook
+child_exit do gunicorn para workers mortos por sinal). Snapshots que não
+são atualizados há mais de METRICS_STALE_AFTER segundos são descartados.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# nome: (tipo, descrição, buckets)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Latência das rotas da API', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', 'Tamanho das respostas da API', SIZE_BUCKETS),
+    'http_requests_in_flight': ('gauge', 'Requisições em andamento', None),
+    'http_request_errors_total': ('counter', 'Respostas com status 5xx', None),
+    'upstream_request_duration_seconds': ('histogram', 'Latência das chamadas externas', LATENCY_BUCKETS),
+    'upstream_request_errors_total': ('counter', 'Falhas nas chamadas externas', None),
+    'operation_duration_seconds': ('histogram', 'Duração de operações internas (PPTX, PNG)', LATENCY_BUCKETS),
+    'operation_output_bytes': ('histogram', 'Tamanho gerado pelas operações internas', SIZE_BUCKETS),
+    'image_fallback_total': ('counter', 'Imagens substituídas por placeholder', None),
+}
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    def __init__(self, metrics_dir=None, flush_interval=None, stale_after=None):
+        self.metrics_dir = metrics_dir or os.getenv('METRICS_DIR') or os.path.join(
+            tempfile.gettempdir(), 'ai_content_studio', 'metrics'
+        )
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv('METRICS_FLUSH_INTERVAL', '1')
+        )
+        self.stale_after = stale_after if stale_after is not None else float(
+            os.getenv('METRICS_STALE_AFTER', '60')
+        )
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._flush_timer = None
+        self._heartbeat = None
+        # Processos filhos (fork) começam do zero e gravam o próprio snapshot
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.remove_snapshot)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def gauge_add(self, name, delta, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+        self._maybe_flush()
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, _labels_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            hist[0][bisect_left(buckets, value)] += 1
+            hist[1] += value
+            hist[2] += 1
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Mede a duração do bloco e registra no histograma
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def upstream(self, upstream):
+        """
+        Mede uma chamada externa e conta exceções como erro
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('upstream_request_errors_total', upstream=upstream)
+            raise
+        finally:
+            self.observe('upstream_request_duration_seconds', time.perf_counter() - start, upstream=upstream)
+
+    def render(self):
+        """
+        Soma os snapshots de todos os processos e gera o texto do Prometheus
+        """
+        self.flush()
+        counters, gauges, histograms = {}, {}, {}
+        for snapshot in self._read_snapshots():
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, value in snapshot['gauges']:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0) + value
+            for name, labels, bucket_counts, total, count in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                hist = histograms.setdefault(key, [[0] * len(bucket_counts), 0.0, 0])
+                hist[0] = [a + b for a, b in zip(hist[0], bucket_counts)]
+                hist[1] += total
+                hist[2] += count
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{self._format_labels(labels)} {value}')
+            elif kind == 'gauge':
+                for (metric, labels), value in sorted(gauges.items()):
+                    if metric == name:
+                        lines.append(f'{name}{self._format_labels(labels)} {value}')
+            else:
+                for (metric, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(buckets) + ['+Inf'], bucket_counts):
+                        cumulative += bucket_count
+                        bucket_labels = labels + (('le', str(bound)),)
+                        lines.append(f'{name}_bucket{self._format_labels(bucket_labels)} {cumulative}')
+                    lines.append(f'{name}_sum{self._format_labels(labels)} {total}')
+                    lines.append(f'{name}_count{self._format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """
+        Grava o snapshot deste processo no diretório compartilhado
+        """
+        pid = os.getpid()
+        with self._lock:
+            snapshot = {
+                'counters': [[n, l, v] for (n, l), v in self._counters.items()],
+                'gauges': [[n, l, v] for (n, l), v in self._gauges.items()],
+                'histograms': [[n, l, h[0], h[1], h[2]] for (n, l), h in self._histograms.items()],
+            }
+            self._last_flush = time.monotonic()
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.metrics_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self._snapshot_path(pid))
+        except OSError:
+            pass
+        self._start_heartbeat()
+
+    def remove_snapshot(self, pid=None):
+        """
+        Apaga o snapshot do processo (o atual, por padrão) ao encerrá-lo
+        """
+        try:
+            os.remove(self._snapshot_path(pid or os.getpid()))
+        except OSError:
+            pass
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.metrics_dir, f'{pid}.json')
+
+    def _start_heartbeat(self):
+        # Regrava o snapshot periodicamente: o mtime mostra que o processo
+        # continua vivo mesmo sem novas métricas
+        if self._heartbeat is not None:
+            return
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='metrics-heartbeat', daemon=True)
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        pid = os.getpid()
+        interval = max(self.flush_interval, self.stale_after / 4)
+        while True:
+            time.sleep(interval)
+            if os.getpid() != pid:
+                return
+            if time.monotonic() - self._last_flush >= interval:
+                self.flush()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counters, self._gauges, self._histograms = {}, {}, {}
+        self._last_flush = 0.0
+        self._flush_timer = None
+        self._heartbeat = None
+
+    def _maybe_flush(self):
+        # A gravação roda sempre em uma thread de timer: quem registra a
+        # métrica (inclusive o event loop de async_upstream) não faz I/O
+        if self._flush_timer is not None:
+            return
+        with self._lock:
+            if self._flush_timer is not None:
+                return
+            delay = max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+            self._flush_timer = threading.Timer(delay, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _timed_flush(self):
+        self._flush_timer = None
+        self.flush()
+
+    def _read_snapshots(self):
+        """
+        Snapshots dos processos ativos; os desatualizados (processo encerrado
+        sem apagar o próprio arquivo) são removidos
+        """
+        try:
+            names = os.listdir(self.metrics_dir)
+        except OSError:
+            return
+        now = time.time()
+        for file_name in names:
+            if not file_name.endswith('.json'):
+                continue
+            path = os.path.join(self.metrics_dir, file_name)
+            try:
+                if now - os.path.getmtime(path) > self.stale_after:
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield snapshot
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        parts = []
+        for k, v in labels:
+            v = v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{k}="{v}"')
+        return '{' + ','.join(parts) + '}'
+
+
+# Registro compartilhado pelo processo
+metrics = MetricsRegistry()
@@ -2,20 +2,110 @@
 Serviço de geração de apresentações PowerPoint
 """
 import os
+import copy
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 import base64
 from io import BytesIO
+from src.services.artifact_service import ArtifactStore
+from src.services.metrics_service import metrics
+
+
+PPTX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+
+# Índices dos layouts no template padrão do python-pptx
+LAYOUT_INDEXES = {
+    'title': 0,
+    'title_and_content': 1,
+    'title_only': 5,
+    'blank': 6,
+}
 
 
 class PresentationService:
-    def __init__(self):
+    # Templates já interpretados (cópias intactas), compartilhados no processo
+    _templates = {}
+    _templates_lock = threading.Lock()
+    
+    def __init__(self, artifact_store=None, templates_dir=None, search_service=None):
         self.default_width = Inches(10)
         self.default_height = Inches(7.5)
+        # Destino das apresentações no modo output='artifact'
+        self.artifact_store = artifact_store or ArtifactStore()
+        # Templates .pptx personalizados: <nome>.pptx neste diretório
+        self.templates_dir = templates_dir or os.getenv('PRESENTATION_TEMPLATES_DIR')
+        self._template_paths = {}
+        # Pesquisa usada por generate_from_topic(research=True)
+        self.search_service = search_service
+        self.research_deadline = float(os.getenv('PRESENTATION_RESEARCH_DEADLINE', '10'))
+        self._research_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='research')
+        # Paginação automática do texto livre (create_from_text)
+        self.max_slide_bullets = int(os.getenv('PRESENTATION_MAX_BULLETS', '6'))
+        self.max_slide_chars = int(os.getenv('PRESENTATION_MAX_CHARS', '600'))
+        # Acima deste tamanho, o arquivo gerado vai para o disco
+        self.spool_max_bytes = int(os.getenv('PRESENTATION_SPOOL_MAX_BYTES', str(8 * 1024 * 1024)))
     
-    def create_presentation(self, title, slides_data):
+    def register_template(self, name, path):
+        """
+        Registra um template .pptx personalizado pelo nome
+        """
+        self._template_paths[name] = path
+        with PresentationService._templates_lock:
+            PresentationService._templates.pop(name, None)
+    
+    def _new_presentation(self, template=None):
+        """
+        Cria uma apresentação a partir de uma cópia do template já interpretado
+        
+        O pacote do template (zip + XML) é lido uma única vez por processo;
+        cada apresentação nova é uma cópia profunda dessa versão intacta.
+        """
+        key = template or '__default__'
+        pristine = PresentationService._templates.get(key)
+        if pristine is None:
+            with PresentationService._templates_lock:
+                pristine = PresentationService._templates.get(key)
+                if pristine is None:
+                    pristine = self._load_template(template)
+                    PresentationService._templates[key] = pristine
+        return copy.deepcopy(pristine)
+    
+    def _load_template(self, template):
+        if template is None:
+            prs = Presentation()
+            prs.slide_width = self.default_width
+            prs.slide_height = self.default_height
+            return prs
+        
+        path = self._template_paths.get(template)
+        if path is None and self.templates_dir:
+            candidate = os.path.join(self.templates_dir, f'{os.path.basename(template)}.pptx')
+            if os.path.exists(candidate):
+                path = candidate
+        if path is None:
+            raise ValueError(f'Template não encontrado: {template}')
+        return Presentation(path)
+    
+    @staticmethod
+    def _resolve_layouts(prs):
+        """
+        Resolve os layouts usados uma única vez por apresentação
+        """
+        slide_layouts = list(prs.slide_layouts)
+        last = len(slide_layouts) - 1
+        return {
+            name: slide_layouts[min(index, last)]
+            for name, index in LAYOUT_INDEXES.items()
+        }
+    
+    def create_presentation(self, title, slides_data, output='inline', template=None):
         """
         Cria uma apresentação PowerPoint
         
@@ -29,58 +119,86 @@ class PresentationService:
                         'layout': 'title_and_content' | 'title_only' | 'blank'
                     }
                 ]
+            output: 'inline' (base64 em 'data'), 'artifact' (URL de download) ou
+                'stream' (arquivo temporário aberto em 'file', para decks grandes)
+            template: Nome de um template registrado (None usa o padrão)
         """
         try:
-            prs = Presentation()
-            prs.slide_width = self.default_width
-            prs.slide_height = self.default_height
+            prs = self._new_presentation(template)
+            layouts = self._resolve_layouts(prs)
             
             # Slide de título
-            title_slide_layout = prs.slide_layouts[0]
-            slide = prs.slides.add_slide(title_slide_layout)
-            title_shape = slide.shapes.title
-            subtitle = slide.placeholders[1]
-            
-            title_shape.text = title
-            subtitle.text = "Criado com AI Content Studio"
+            slide = prs.slides.add_slide(layouts['title'])
+            if slide.shapes.title:
+                slide.shapes.title.text = title
+            if len(slide.placeholders) > 1:
+                slide.placeholders[1].text = "Criado com AI Content Studio"
             
             # Adiciona slides de conteúdo
             for slide_data in slides_data:
-                self._add_content_slide(prs, slide_data)
-            
-            # Salva em memória
-            output = BytesIO()
-            prs.save(output)
-            output.seek(0)
+                self._add_content_slide(prs, slide_data, layouts)
             
-            # Converte para base64
-            pptx_data = base64.b64encode(output.getvalue()).decode()
-            
-            return {
+            result = {
                 'success': True,
-                'data': pptx_data,
                 'filename': f'{title.replace(" ", "_")}.pptx',
                 'slides_count': len(prs.slides)
             }
             
+            if output in ('stream', 'artifact'):
+                # Arquivo temporário que passa para o disco acima do limite,
+                # sem cópias completas do pacote em memória
+                spooled = self._save_spooled(prs)
+                if output == 'artifact':
+                    with spooled:
+                        artifact = self.artifact_store.put_file(spooled, PPTX_MIME_TYPE)
+                    result['artifact'] = artifact
+                    result['url'] = artifact['url']
+                else:
+                    result['file'] = spooled
+                    result['size'] = spooled.tell()
+                    spooled.seek(0)
+            else:
+                # Salva em memória e converte para base64
+                buffered = BytesIO()
+                self._save(prs, buffered)
+                result['data'] = base64.b64encode(buffered.getbuffer()).decode()
+            
+            return result
+            
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
-    def _add_content_slide(self, prs, slide_data):
+    def _save(self, prs, fileobj):
+        with metrics.timer('operation_duration_seconds', operation='pptx_serialize'):
+            prs.save(fileobj)
+        metrics.observe('operation_output_bytes', fileobj.tell(), operation='pptx_serialize')
+    
+    def _save_spooled(self, prs):
+        """
+        Salva em um SpooledTemporaryFile (memória até o limite, depois disco)
+        """
+        spooled = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+        try:
+            self._save(prs, spooled)
+        except Exception:
+            spooled.close()
+            raise
+        return spooled
+    
+    def _add_content_slide(self, prs, slide_data, layouts=None):
         """
         Adiciona um slide de conteúdo à apresentação
         """
+        layouts = layouts or self._resolve_layouts(prs)
         layout_type = slide_data.get('layout', 'title_and_content')
         
-        if layout_type == 'title_only':
-            slide_layout = prs.slide_layouts[5]  # Title only
-        elif layout_type == 'blank':
-            slide_layout = prs.slide_layouts[6]  # Blank
+        if layout_type in ('title_only', 'blank'):
+            slide_layout = layouts[layout_type]
         else:
-            slide_layout = prs.slide_layouts[1]  # Title and Content
+            slide_layout = layouts['title_and_content']
         
         slide = prs.slides.add_slide(slide_layout)
         
@@ -115,47 +233,22 @@ class PresentationService:
                 p.text = content
                 p.font.size = Pt(18)
     
-    def generate_from_topic(self, topic, num_slides=5):
+    def generate_from_topic(self, topic, num_slides=5, output='inline', template=None, research=False):
         """
         Gera uma apresentação básica a partir de um tópico
+        
+        Com research=True, o conteúdo vem da Wikipedia e do DuckDuckGo
+        (ver _research_slides); se a pesquisa falhar, usa a estrutura básica.
         """
         try:
-            # Estrutura básica de apresentação
-            slides_data = []
+            slides_data = None
+            if research and self.search_service is not None:
+                slides_data = self._research_slides(topic, num_slides)
             
-            # Slide de introdução
-            slides_data.append({
-                'title': 'Introdução',
-                'content': [
-                    f'Visão geral sobre {topic}',
-                    'Conceitos principais',
-                    'Importância e aplicações'
-                ]
-            })
-            
-            # Slides de conteúdo
-            for i in range(2, num_slides):
-                slides_data.append({
-                    'title': f'Tópico {i-1}',
-                    'content': [
-                        f'Aspecto {i-1} de {topic}',
-                        'Detalhes e características',
-                        'Exemplos práticos',
-                        'Considerações importantes'
-                    ]
-                })
-            
-            # Slide de conclusão
-            slides_data.append({
-                'title': 'Conclusão',
-                'content': [
-                    'Resumo dos pontos principais',
-                    'Próximos passos',
-                    'Recursos adicionais'
-                ]
-            })
+            if not slides_data:
+                slides_data = self._outline_slides(topic, num_slides)
             
-            return self.create_presentation(topic, slides_data)
+            return self.create_presentation(topic, slides_data, output, template)
             
         except Exception as e:
             return {
@@ -163,63 +256,304 @@ class PresentationService:
                 'error': str(e)
             }
     
-    def create_from_text(self, title, text_content):
+    def _outline_slides(self, topic, num_slides):
         """
-        Cria apresentação a partir de texto livre
-        Divide o texto em slides automaticamente
+        Estrutura básica de apresentação (sem pesquisa)
+        """
+        slides_data = []
+        
+        # Slide de introdução
+        slides_data.append({
+            'title': 'Introdução',
+            'content': [
+                f'Visão geral sobre {topic}',
+                'Conceitos principais',
+                'Importância e aplicações'
+            ]
+        })
+        
+        # Slides de conteúdo
+        for i in range(2, num_slides):
+            slides_data.append({
+                'title': f'Tópico {i-1}',
+                'content': [
+                    f'Aspecto {i-1} de {topic}',
+                    'Detalhes e características',
+                    'Exemplos práticos',
+                    'Considerações importantes'
+                ]
+            })
+        
+        # Slide de conclusão
+        slides_data.append({
+            'title': 'Conclusão',
+            'content': [
+                'Resumo dos pontos principais',
+                'Próximos passos',
+                'Recursos adicionais'
+            ]
+        })
+        
+        return slides_data
+    
+    def _research_slides(self, topic, num_slides, deadline=None):
+        """
+        Monta os slides a partir da Wikipedia (seções) e do DuckDuckGo (fontes)
+        
+        As duas fontes são consultadas em paralelo e os slides de cada uma são
+        montados assim que ela responde; o que não chegar dentro do prazo
+        fica de fora.
         """
+        deadline = self.research_deadline if deadline is None else deadline
+        futures = {
+            self._research_executor.submit(self.search_service.get_wikipedia_sections, topic): 'wikipedia',
+            self._research_executor.submit(self.search_service.search_web, topic, 5): 'web'
+        }
+        
+        intro, sections, sources = None, [], []
         try:
-            # Divide texto em parágrafos
-            paragraphs = [p.strip() for p in text_content.split('\n\n') if p.strip()]
-            
-            slides_data = []
-            current_slide = None
-            
-            for para in paragraphs:
-                # Se o parágrafo é curto, pode ser um título
-                if len(para) < 100 and not para.endswith('.'):
-                    if current_slide:
-                        slides_data.append(current_slide)
-                    current_slide = {
-                        'title': para,
-                        'content': []
+            for future in as_completed(futures, timeout=deadline):
+                result = future.result()
+                if not result.get('success'):
+                    continue
+                if futures[future] == 'wikipedia':
+                    intro = {
+                        'title': 'Introdução',
+                        'content': _text_to_bullets(result['summary'])
                     }
+                    sections = [
+                        {'title': section['title'], 'content': _text_to_bullets(section['text'])}
+                        for section in result['sections']
+                    ]
+                    sources.insert(0, f"Wikipedia: {result['url']}")
                 else:
-                    # Divide em pontos se houver quebras de linha
-                    if '\n' in para:
-                        points = [p.strip() for p in para.split('\n') if p.strip()]
-                        if current_slide:
-                            current_slide['content'].extend(points)
-                        else:
-                            current_slide = {
-                                'title': 'Conteúdo',
-                                'content': points
-                            }
-                    else:
-                        if current_slide:
-                            current_slide['content'].append(para)
-                        else:
-                            current_slide = {
-                                'title': 'Conteúdo',
-                                'content': [para]
-                            }
-            
-            # Adiciona último slide
-            if current_slide:
-                slides_data.append(current_slide)
-            
-            # Se não houver slides, cria um básico
-            if not slides_data:
-                slides_data.append({
-                    'title': 'Conteúdo',
-                    'content': [text_content]
-                })
-            
-            return self.create_presentation(title, slides_data)
+                    web_results = result.get('results', [])
+                    sources.extend(f"{item['title']}: {item['url']}" for item in web_results)
+                    if intro is None and web_results:
+                        # Sem Wikipedia (ainda): usa os trechos da web como introdução
+                        intro = {
+                            'title': 'Introdução',
+                            'content': [_shorten(item['snippet']) for item in web_results[:MAX_RESEARCH_BULLETS]]
+                        }
+        except FuturesTimeoutError:
+            pass
+        
+        if intro is None:
+            return None
+        
+        # Introdução + seções + fontes, limitado a num_slides
+        body = sections[:max(0, num_slides - 2)]
+        slides_data = [intro] + [slide for slide in body if slide['content']]
+        if sources:
+            slides_data.append({
+                'title': 'Fontes',
+                'content': sources[:MAX_RESEARCH_BULLETS + 1]
+            })
+        return slides_data
+    
+    def create_from_text(self, title, text_content, output='inline', template=None):
+        """
+        Cria apresentação a partir de texto livre
+        Divide o texto em slides automaticamente (ver segment_text)
+        """
+        try:
+            return self.create_presentation(title, self.segment_text(text_content), output, template)
             
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
+    
+    def segment_text(self, text_content):
+        """
+        Gera os slides de um texto livre em uma única passada
+        
+        Parágrafos (separados por linha em branco) curtos e sem ponto final,
+        ou linhas iniciadas por '#', viram títulos; as demais linhas viram
+        tópicos (marcadores '-', '*', '•', '1.' são removidos). Quando um
+        slide atinge max_bullets tópicos ou max_chars caracteres, o conteúdo
+        segue em um slide de continuação. O texto não é dividido em listas
+        de parágrafos: apenas o slide atual fica em memória.
+        """
+        slide_title = None
+        points = []
+        chars = 0
+        emitted = False
+        
+        for kind, text in _iter_text_blocks(text_content):
+            if kind == 'title':
+                if slide_title is not None:
+                    yield {'title': slide_title, 'content': points}
+                    emitted = True
+                slide_title, points, chars = text, [], 0
+                continue
+            
+            if slide_title is None:
+                slide_title = 'Conteúdo'
+            for chunk in _split_long_text(text, self.max_slide_chars):
+                # Slide cheio: continua em um novo slide com o mesmo título
+                if points and (len(points) >= self.max_slide_bullets or chars + len(chunk) > self.max_slide_chars):
+                    yield {'title': slide_title, 'content': points}
+                    emitted = True
+                    if not slide_title.endswith(CONTINUATION_SUFFIX):
+                        slide_title += CONTINUATION_SUFFIX
+                    points, chars = [], 0
+                points.append(chunk)
+                chars += len(chunk)
+        
+        # Adiciona último slide
+        if slide_title is not None:
+            yield {'title': slide_title, 'content': points}
+            emitted = True
+        
+        # Se não houver slides, cria um básico
+        if not emitted:
+            yield {
+                'title': 'Conteúdo',
+                'content': [text_content]
+            }
+
+
+CONTINUATION_SUFFIX = ' (cont.)'
+
+# Tópicos por slide e tamanho máximo de cada tópico nos slides de pesquisa
+MAX_RESEARCH_BULLETS = 4
+MAX_RESEARCH_BULLET_CHARS = 180
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Parágrafos mais curtos que isto e sem ponto final são tratados como título
+TITLE_MAX_CHARS = 100
+
+_BULLET_RE = re.compile(r'^(?:[-*•]|\d+[.)])\s+')
+
+
+def _iter_lines(text):
+    """
+    Itera as linhas do texto sem criar a lista completa
+    """
+    pos = 0
+    length = len(text)
+    while pos < length:
+        end = text.find('\n', pos)
+        if end == -1:
+            end = length
+        yield text[pos:end]
+        pos = end + 1
+
+
+def _iter_text_blocks(text):
+    """
+    Classifica o texto em ('title', texto) e ('point', texto) em uma passada
+    
+    Só as linhas de um parágrafo ainda candidato a título (até
+    TITLE_MAX_CHARS caracteres) ficam em buffer.
+    """
+    pending = []
+    pending_chars = 0
+    in_content = False
+    
+    def flush_pending():
+        for line in pending:
+            yield 'point', line
+    
+    for raw_line in _iter_lines(text):
+        line = raw_line.strip()
+        
+        if not line:
+            # Fim do parágrafo: se ainda é candidato, decide se é título
+            if pending:
+                joined = ' '.join(pending)
+                if joined.endswith('.'):
+                    yield from flush_pending()
+                else:
+                    yield 'title', joined
+            pending, pending_chars, in_content = [], 0, False
+            continue
+        
+        if line.startswith('#'):
+            # Cabeçalho estilo Markdown
+            yield from flush_pending()
+            pending, pending_chars, in_content = [], 0, False
+            heading = line.lstrip('#').strip()
+            if heading:
+                yield 'title', heading
+            continue
+        
+        bullet = _BULLET_RE.match(line)
+        if bullet:
+            # Linha curta logo antes de uma lista é o título da lista
+            joined = ' '.join(pending)
+            if pending and not joined.endswith('.'):
+                yield 'title', joined
+            else:
+                yield from flush_pending()
+            pending, pending_chars, in_content = [], 0, True
+            line = line[bullet.end():]
+            if line:
+                yield 'point', line
+            continue
+        
+        if in_content:
+            yield 'point', line
+            continue
+        
+        pending.append(line)
+        pending_chars += len(line) + 1
+        if pending_chars > TITLE_MAX_CHARS:
+            # Longo demais para ser título: o parágrafo é conteúdo
+            yield from flush_pending()
+            pending, pending_chars, in_content = [], 0, True
+    
+    if pending:
+        joined = ' '.join(pending)
+        if joined.endswith('.'):
+            yield from flush_pending()
+        else:
+            yield 'title', joined
+
+
+def _split_long_text(text, max_chars):
+    """
+    Divide um tópico maior que max_chars em pedaços, quebrando em espaços
+
+    Percorre o texto por deslocamento (sem recortar o restante a cada
+    pedaço), em tempo linear mesmo para uma única linha de vários MB.
+    """
+    start, end = 0, len(text)
+    while end - start > max_chars:
+        cut = text.rfind(' ', start, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        yield text[start:cut].rstrip()
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        yield text[start:]
+
+
+def _shorten(text, max_chars=MAX_RESEARCH_BULLET_CHARS):
+    """
+    Corta o texto em um limite de palavra, com reticências
+    """
+    text = ' '.join(text.split())
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars - 1)
+    return text[:cut if cut > 0 else max_chars - 1].rstrip(' ,;:') + '…'
+
 
+def _text_to_bullets(text, max_bullets=MAX_RESEARCH_BULLETS):
+    """
+    Transforma um texto corrido nas primeiras frases, uma por tópico
+    """
+    bullets = []
+    for paragraph in text.split('\n'):
+        for sentence in _SENTENCE_RE.split(paragraph.strip()):
+            if sentence:
+                bullets.append(_shorten(sentence))
+                if len(bullets) >= max_bullets:
+                    return bullets
+    return bullets
@@ -0,0 +1,91 @@
+"""
+Limitador de taxa (token bucket) adaptativo para chamadas externas
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket compartilhado entre threads com ajuste AIMD: a taxa cai pela
+    metade quando o upstream responde 429 e volta a subir aos poucos a cada
+    resposta bem-sucedida, até max_rate.
+    """
+
+    def __init__(self, rate, capacity, min_rate=None, increase_step=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate or rate / 16
+        self.increase_step = increase_step or rate / 10
+
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """
+        Consome um token, aguardando até timeout segundos.
+        Retorna False se o tempo acabar.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    def try_acquire(self):
+        """
+        Consome um token sem esperar. Retorna 0 se conseguiu ou quantos
+        segundos faltam para o próximo token (para quem espera de forma
+        assíncrona)
+        """
+        with self._cond:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def on_throttle(self):
+        """
+        Upstream sinalizou limite (429): reduz a taxa e esvazia o balde
+        """
+        with self._cond:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self):
+        """
+        Resposta bem-sucedida: recupera a taxa gradualmente
+        """
+        with self._cond:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            return {
+                'rate': round(self.rate, 3),
+                'max_rate': self.max_rate,
+                'tokens': round(self._tokens, 3),
+                'capacity': self.capacity
+            }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
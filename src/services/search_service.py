@@ -1,24 +1,118 @@
 """
 Serviço de pesquisa usando DuckDuckGo e Wikipedia
 """
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 import wikipediaapi
 from duckduckgo_search import DDGS
+from src.services.cache_service import TTLCache
+from src.services.metrics_service import metrics
+
+
+# Seções da Wikipedia sem conteúdo útil para slides
+WIKI_SKIP_SECTIONS = {
+    'referências', 'ligações externas', 'ver também', 'bibliografia',
+    'notas', 'notas e referências', 'leitura adicional', 'fontes'
+}
 
 
 class SearchService:
     def __init__(self):
+        self.language = 'pt'
         self.wiki = wikipediaapi.Wikipedia(
             user_agent='AIContentStudio/1.0',
-            language='pt'
+            language=self.language
+        )
+        # Prazo total da pesquisa combinada (segundos)
+        self.deadline = float(os.getenv('SEARCH_DEADLINE', '8'))
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('SEARCH_WORKERS', '8')),
+            thread_name_prefix='search'
+        )
+        
+        # Caches por fonte; entradas expiradas são servidas enquanto
+        # uma atualização roda em segundo plano (stale-while-revalidate)
+        # O cache da Wikipedia guarda texto de páginas e seções: o limite em
+        # bytes (por cache) é o que realmente controla a memória
+        stale_ttl = float(os.getenv('SEARCH_STALE_TTL', '86400'))
+        max_entries = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '1024'))
+        max_bytes = int(os.getenv('SEARCH_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+        self.web_cache = TTLCache(
+            'web', float(os.getenv('SEARCH_WEB_TTL', '600')), stale_ttl, max_entries, max_bytes
+        )
+        self.wiki_cache = TTLCache(
+            'wikipedia', float(os.getenv('SEARCH_WIKI_TTL', '3600')), stale_ttl, max_entries, max_bytes
         )
     
     def search_web(self, query, max_results=5):
+        """
+        Pesquisa na web usando DuckDuckGo (com cache)
+        """
+        key = (self._normalize(query), self.language, max_results)
+        return self.web_cache.get_or_load(
+            key,
+            lambda: self._fetch_web(query, max_results),
+            executor=self._executor,
+            should_cache=self._is_cacheable
+        )
+    
+    def search_wikipedia(self, query):
+        """
+        Pesquisa na Wikipedia (com cache, inclusive de páginas não encontradas)
+        """
+        key = (self._normalize_title(query), self.language)
+        return self.wiki_cache.get_or_load(
+            key,
+            lambda: self._fetch_wikipedia(query),
+            executor=self._executor,
+            should_cache=self._is_cacheable
+        )
+    
+    def get_wikipedia_sections(self, query):
+        """
+        Obtém a estrutura da página da Wikipedia com o texto de cada seção
+        (com cache). Seções de referência/ligações externas são ignoradas.
+        """
+        key = ('sections', self._normalize_title(query), self.language)
+        return self.wiki_cache.get_or_load(
+            key,
+            lambda: self._fetch_wikipedia_sections(query),
+            executor=self._executor,
+            should_cache=self._is_cacheable
+        )
+    
+    def cache_stats(self):
+        """
+        Retorna estatísticas dos caches de pesquisa
+        """
+        return {
+            'web': self.web_cache.stats(),
+            'wikipedia': self.wiki_cache.stats()
+        }
+    
+    @staticmethod
+    def _normalize(query):
+        return ' '.join(query.lower().split())
+    
+    @staticmethod
+    def _normalize_title(query):
+        # Títulos da Wikipedia diferenciam maiúsculas (ex.: "Java" e "JAVA")
+        return ' '.join(query.split())
+    
+    @staticmethod
+    def _is_cacheable(result):
+        # Erros (exceções) não são armazenados; resultados vazios e
+        # "página não encontrada" são
+        return 'error' not in result
+    
+    def _fetch_web(self, query, max_results):
         """
         Pesquisa na web usando DuckDuckGo
         """
         try:
             results = []
-            with DDGS() as ddgs:
+            with metrics.upstream('duckduckgo'), DDGS() as ddgs:
                 search_results = ddgs.text(query, max_results=max_results)
                 for result in search_results:
                     results.append({
@@ -38,37 +132,78 @@ class SearchService:
                 'results': []
             }
     
-    def search_wikipedia(self, query):
+    def _fetch_wikipedia_sections(self, query):
         """
-        Pesquisa na Wikipedia
+        Busca a página e suas seções na Wikipedia
         """
         try:
-            page = self.wiki.page(query)
-            
-            if not page.exists():
-                # Tenta buscar páginas relacionadas
-                search_results = self.wiki.search(query, results=3)
-                if search_results:
+            with metrics.upstream('wikipedia'):
+                page = self.wiki.page(query)
+                if not page.exists():
                     return {
-                        'success': True,
+                        'success': False,
                         'found': False,
-                        'suggestions': search_results,
-                        'message': 'Página não encontrada. Sugestões disponíveis.'
+                        'message': 'Nenhum resultado encontrado na Wikipedia.'
                     }
+                
+                # Resumo e seções vêm da mesma resposta (extracts)
+                sections = []
+                for section in page.sections:
+                    if section.title.strip().lower() in WIKI_SKIP_SECTIONS:
+                        continue
+                    text = '\n'.join(
+                        part for part in [section.text] + [sub.text for sub in section.sections] if part
+                    )
+                    if text.strip():
+                        sections.append({'title': section.title, 'text': text})
+                
                 return {
-                    'success': False,
-                    'found': False,
-                    'message': 'Nenhum resultado encontrado na Wikipedia.'
+                    'success': True,
+                    'found': True,
+                    'title': page.title,
+                    'url': page.fullurl,
+                    'summary': page.summary,
+                    'sections': sections
                 }
-            
+        except Exception as e:
             return {
-                'success': True,
-                'found': True,
-                'title': page.title,
-                'summary': page.summary[:500] + '...' if len(page.summary) > 500 else page.summary,
-                'url': page.fullurl,
-                'full_text': page.text[:2000] if len(page.text) > 2000 else page.text
+                'success': False,
+                'error': str(e),
+                'found': False
             }
+    
+    def _fetch_wikipedia(self, query):
+        """
+        Pesquisa na Wikipedia
+        """
+        try:
+            with metrics.upstream('wikipedia'):
+                page = self.wiki.page(query)
+            
+                if not page.exists():
+                    # Tenta buscar páginas relacionadas
+                    search_results = self.wiki.search(query, results=3)
+                    if search_results:
+                        return {
+                            'success': True,
+                            'found': False,
+                            'suggestions': search_results,
+                            'message': 'Página não encontrada. Sugestões disponíveis.'
+                        }
+                    return {
+                        'success': False,
+                        'found': False,
+                        'message': 'Nenhum resultado encontrado na Wikipedia.'
+                    }
+            
+                return {
+                    'success': True,
+                    'found': True,
+                    'title': page.title,
+                    'summary': page.summary[:500] + '...' if len(page.summary) > 500 else page.summary,
+                    'url': page.fullurl,
+                    'full_text': page.text[:2000] if len(page.text) > 2000 else page.text
+                }
         except Exception as e:
             return {
                 'success': False,
@@ -76,16 +211,59 @@ class SearchService:
                 'found': False
             }
     
-    def combined_search(self, query, max_web_results=5):
+    def combined_search(self, query, max_web_results=5, deadline=None):
         """
         Combina resultados de DuckDuckGo e Wikipedia
+        
+        As duas fontes são consultadas em paralelo sob um único prazo.
+        Fontes que não terminarem a tempo são marcadas com timed_out.
         """
-        web_results = self.search_web(query, max_web_results)
-        wiki_results = self.search_wikipedia(query)
+        deadline = self.deadline if deadline is None else deadline
+        start = time.perf_counter()
         
-        return {
-            'query': query,
-            'web': web_results,
-            'wikipedia': wiki_results
+        futures = {
+            'web': self._executor.submit(self._timed, self.search_web, query, max_web_results),
+            'wikipedia': self._executor.submit(self._timed, self.search_wikipedia, query)
         }
-
+        wait(futures.values(), timeout=deadline)
+        
+        outcomes = {
+            source: future.result() if future.done() else None
+            for source, future in futures.items()
+        }
+        return self._combine_results(query, outcomes, start)
+    
+    @staticmethod
+    def _combine_results(query, outcomes, start):
+        """
+        Monta a resposta combinada; fontes sem resultado (None) expiraram
+        """
+        response = {'query': query}
+        timings = {}
+        for source, outcome in outcomes.items():
+            if outcome is not None:
+                result, elapsed = outcome
+                result['timed_out'] = False
+                timings[source] = elapsed
+            else:
+                result = {
+                    'success': False,
+                    'error': 'Tempo limite excedido',
+                    'timed_out': True
+                }
+                if source == 'web':
+                    result['results'] = []
+                else:
+                    result['found'] = False
+                timings[source] = None
+            response[source] = result
+        
+        timings['total'] = round((time.perf_counter() - start) * 1000, 1)
+        response['timings_ms'] = timings
+        return response
+    
+    @staticmethod
+    def _timed(func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        return result, round((time.perf_counter() - start) * 1000, 1)
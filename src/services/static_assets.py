@@ -0,0 +1,114 @@
+"""
+Manifesto em memória dos arquivos estáticos (SPA) com variantes pré-comprimidas
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional: sem ele, só gzip
+    brotli = None
+
+
+# Tipos que valem a pena comprimir (imagens e fontes já são comprimidas)
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'image/x-icon',
+                      'image/vnd.microsoft.icon')
+MIN_COMPRESS_BYTES = 512
+
+# Arquivos com hash no nome (gerados pelo build) nunca mudam
+IMMUTABLE_PREFIX = 'assets/'
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=3600'
+INDEX_CACHE = 'no-cache'
+
+
+class StaticManifest:
+    """
+    Lê o diretório estático uma única vez (na inicialização) e mantém o
+    conteúdo, o ETag e as variantes gzip/brotli de cada arquivo em memória.
+    Servir um arquivo não acessa o disco.
+    """
+
+    def __init__(self, static_dir, index_name='index.html'):
+        self.static_dir = static_dir
+        self.index_name = index_name
+        self.entries = {}
+        self.scan()
+
+    def scan(self):
+        """
+        (Re)constrói o manifesto a partir do diretório
+        """
+        entries = {}
+        for root, _, files in os.walk(self.static_dir):
+            for file_name in files:
+                path = os.path.join(root, file_name)
+                rel_path = os.path.relpath(path, self.static_dir).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    entries[rel_path] = self._build_entry(rel_path, f.read())
+        self.entries = entries
+        return len(entries)
+
+    def _build_entry(self, rel_path, data):
+        mime_type = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+        variants = {'identity': data}
+        if mime_type.startswith(COMPRESSIBLE_TYPES) and len(data) >= MIN_COMPRESS_BYTES:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                variants['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    variants['br'] = compressed
+
+        if rel_path.startswith(IMMUTABLE_PREFIX):
+            cache_control = IMMUTABLE_CACHE
+        elif rel_path == self.index_name:
+            cache_control = INDEX_CACHE
+        else:
+            cache_control = DEFAULT_CACHE
+
+        return {
+            'mime_type': mime_type,
+            'etag': hashlib.sha256(data).hexdigest()[:32],
+            'variants': variants,
+            'cache_control': cache_control
+        }
+
+    def get(self, path):
+        """
+        Entrada do arquivo; caminhos desconhecidos caem no index.html (rotas da SPA)
+        """
+        return self.entries.get(path) or self.entries.get(self.index_name)
+
+    def response(self, path):
+        """
+        Resposta para o caminho, com a codificação escolhida pelo Accept-Encoding
+        """
+        entry = self.get(path)
+        if entry is None:
+            return None
+
+        variants = entry['variants']
+        # br > gzip > identity quando o cliente aceita com a mesma qualidade
+        encoding = request.accept_encodings.best_match(
+            [name for name in ('br', 'gzip') if name in variants] + ['identity'],
+            default='identity'
+        )
+        etag = entry['etag'] if encoding == 'identity' else f"{entry['etag']}-{encoding}"
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(variants[encoding], mimetype=entry['mime_type'])
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = entry['cache_control']
+        if len(variants) > 1:
+            response.vary.add('Accept-Encoding')
+        return response
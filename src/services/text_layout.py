@@ -0,0 +1,93 @@
+"""
+Renderização de texto compartilhada: cache de fontes e quebra de linhas
+"""
+import threading
+from functools import lru_cache
+
+from PIL import ImageFont
+
+
+FONT_REGULAR = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+_fonts = {}
+_fonts_lock = threading.Lock()
+
+
+def get_font(path, size):
+    """
+    Retorna a fonte carregada (uma única vez por processo)
+    """
+    key = (path, size)
+    font = _fonts.get(key)
+    if font is None:
+        with _fonts_lock:
+            font = _fonts.get(key)
+            if font is None:
+                try:
+                    font = ImageFont.truetype(path, size)
+                except OSError:
+                    font = ImageFont.load_default()
+                _fonts[key] = font
+    return font
+
+
+@lru_cache(maxsize=8192)
+def word_width(font, word):
+    """
+    Largura (avanço) de uma palavra, em cache por fonte
+    """
+    return font.getlength(word)
+
+
+def text_size(font, text):
+    """
+    Largura e altura da caixa do texto
+    """
+    bbox = font.getbbox(text)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
+def wrap_text(text, font, max_width, max_lines=None):
+    """
+    Quebra o texto em linhas de até max_width pixels em uma única passada
+
+    A largura de cada linha é acumulada a partir das larguras das palavras,
+    sem medir novamente a linha inteira a cada palavra. Uma palavra maior
+    que max_width ocupa sozinha uma linha.
+    """
+    space = word_width(font, ' ')
+    lines = []
+    current_line = []
+    current_width = 0
+
+    for word in text.split():
+        width = word_width(font, word)
+        if not current_line:
+            current_line.append(word)
+            current_width = width
+            continue
+
+        if current_width + space + width < max_width:
+            current_line.append(word)
+            current_width += space + width
+        else:
+            lines.append(' '.join(current_line))
+            if max_lines is not None and len(lines) >= max_lines:
+                return lines
+            current_line = [word]
+            current_width = width
+
+    if current_line:
+        lines.append(' '.join(current_line))
+
+    return lines[:max_lines] if max_lines is not None else lines
+
+
+def draw_centered_text(draw, text, font, width, height, fill=(255, 255, 255)):
+    """
+    Desenha o texto centralizado em uma área width x height
+    """
+    text_width, text_height = text_size(font, text)
+    position = ((width - text_width) // 2, (height - text_height) // 2)
+    draw.text(position, text, fill=fill, font=font)
@@ -3,18 +3,66 @@ Serviço de criação de vídeos simples (slideshow)
 """
 import os
 import base64
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+from PIL import Image, ImageDraw
 import json
+from src.services.cache_service import ResultCache, make_cache_key
+from src.services.image_format import IMAGE_FORMATS, encode_image, normalize_format
+from src.services.video_effects import TRANSITION_FUNCTIONS, ken_burns as ken_burns_motion
+from src.services.text_layout import FONT_BOLD, FONT_REGULAR, get_font, wrap_text, draw_centered_text
+
+
+_worker_service = None
+
+
+def _render_frame_task(settings, idx, img_data, duration_per_image, frame_format='png', quality=None):
+    """
+    Renderiza um frame em um processo do pool (precisa ser função de módulo)
+    """
+    global _worker_service
+    settings = dict(settings)
+    image_cache_bytes = settings.pop('image_cache_bytes')
+    if _worker_service is None:
+        _worker_service = VideoService()
+    _worker_service.__dict__.update(settings)
+    # Cada processo recebe uma fração do orçamento total do cache
+    _worker_service.image_cache.max_memory_bytes = image_cache_bytes
+    return _worker_service._build_frame_info(idx, img_data, duration_per_image, frame_format, quality)
 
 
 class VideoService:
+    _pools = None
+    _pool_lock = threading.Lock()
+    
     def __init__(self):
         self.default_width = 1280
         self.default_height = 720
         self.default_fps = 30
+        self.transition_duration = float(os.getenv('VIDEO_TRANSITION_DURATION', '0.75'))
+        
+        # Renderização paralela: pool dimensionado pela máquina e
+        # quantidade mínima de slides para compensar o custo de IPC
+        self.render_workers = int(os.getenv('VIDEO_RENDER_WORKERS', '0')) or os.cpu_count() or 1
+        self.parallel_min_slides = int(os.getenv('VIDEO_PARALLEL_MIN_SLIDES', '4'))
+        
+        # Imagens decodificadas e redimensionadas (RGB compacto, 3 bytes por
+        # pixel), limitadas pelo total de bytes; por processo. Na renderização
+        # paralela o orçamento é dividido entre os processos do pool
+        self.image_cache_bytes = int(os.getenv('VIDEO_IMAGE_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+        self.image_cache = ResultCache(
+            'video_image',
+            max_entries=int(os.getenv('VIDEO_IMAGE_CACHE_MAX_ENTRIES', '256')),
+            max_memory_bytes=self.image_cache_bytes
+        )
     
-    def create_slideshow_frames(self, images_data, duration_per_image=3):
+    def create_slideshow_frames(self, images_data, duration_per_image=3, parallel=None,
+                                frame_format='png', quality=None):
         """
         Cria frames para um vídeo slideshow
         
@@ -27,57 +75,33 @@ class VideoService:
                     }
                 ]
             duration_per_image: Duração de cada imagem em segundos
+            parallel: True/False força o modo; None decide pelo número de slides
+            frame_format: Formato dos frames ('png', 'jpeg' ou 'webp')
+            quality: Qualidade para jpeg/webp (1-100)
         
         Returns:
             Informações sobre os frames gerados
         """
         try:
-            frames_info = []
-            total_frames = 0
+            frame_format = normalize_format(frame_format) or 'png'
+            if parallel is None:
+                parallel = self.render_workers > 1 and len(images_data) >= self.parallel_min_slides
             
-            for idx, img_data in enumerate(images_data):
-                # Processa imagem
-                if isinstance(img_data.get('image'), str):
-                    if img_data['image'].startswith('data:image'):
-                        # Remove header do base64
-                        img_base64 = img_data['image'].split(',')[1]
-                        img_bytes = base64.b64decode(img_base64)
-                        img = Image.open(BytesIO(img_bytes))
-                    else:
-                        # Assume que é um caminho de arquivo
-                        img = Image.open(img_data['image'])
-                else:
-                    # Cria imagem placeholder
-                    img = self._create_placeholder_image(f"Slide {idx + 1}")
-                
-                # Redimensiona para tamanho padrão
-                img = img.resize((self.default_width, self.default_height), Image.Resampling.LANCZOS)
-                
-                # Adiciona legenda se fornecida
-                if img_data.get('caption'):
-                    img = self._add_caption(img, img_data['caption'])
-                
-                # Calcula número de frames
-                num_frames = duration_per_image * self.default_fps
-                total_frames += num_frames
-                
-                # Converte para base64
-                buffered = BytesIO()
-                img.save(buffered, format="PNG")
-                img_base64 = base64.b64encode(buffered.getvalue()).decode()
-                
-                frames_info.append({
-                    'index': idx,
-                    'frame_data': f'data:image/png;base64,{img_base64}',
-                    'duration': duration_per_image,
-                    'num_frames': num_frames
-                })
+            if parallel:
+                frames_info = self._render_frames_parallel(images_data, duration_per_image, frame_format, quality)
+            else:
+                frames_info = [
+                    self._build_frame_info(idx, img_data, duration_per_image, frame_format, quality)
+                    for idx, img_data in enumerate(images_data)
+                ]
+            total_frames = sum(frame['num_frames'] for frame in frames_info)
             
             return {
                 'success': True,
                 'frames': frames_info,
                 'total_frames': total_frames,
                 'fps': self.default_fps,
+                'frame_format': frame_format,
                 'total_duration': len(images_data) * duration_per_image,
                 'resolution': f'{self.default_width}x{self.default_height}'
             }
@@ -88,6 +112,227 @@ class VideoService:
                 'error': str(e)
             }
     
+    def _build_frame_info(self, idx, img_data, duration_per_image, frame_format='png', quality=None):
+        """
+        Renderiza um slide e o codifica em base64 (PNG por padrão)
+        """
+        img = self._render_slide(idx, img_data)
+        
+        # Calcula número de frames
+        num_frames = duration_per_image * self.default_fps
+        
+        # Converte para base64
+        img_base64 = base64.b64encode(encode_image(img, frame_format, quality)).decode()
+        
+        return {
+            'index': idx,
+            'frame_data': f'data:{IMAGE_FORMATS[frame_format][0]};base64,{img_base64}',
+            'duration': duration_per_image,
+            'num_frames': num_frames
+        }
+    
+    def _render_frames_parallel(self, images_data, duration_per_image, frame_format='png', quality=None):
+        """
+        Distribui a renderização dos slides entre os processos do pool,
+        mantendo a ordem original
+        
+        Cada slide vai sempre para o mesmo processo (pelo hash da origem),
+        então o cache de imagens daquele processo é reaproveitado quando o
+        slideshow é renderizado de novo.
+        """
+        pools = self._get_pools()
+        settings = {
+            'default_width': self.default_width,
+            'default_height': self.default_height,
+            'default_fps': self.default_fps,
+            'image_cache_bytes': self.image_cache_bytes // len(pools)
+        }
+        futures = []
+        for idx, img_data in enumerate(images_data):
+            shard = int(self._source_key(idx, img_data)[:8], 16) % len(pools)
+            futures.append(pools[shard].submit(
+                _render_frame_task, settings, idx, img_data, duration_per_image, frame_format, quality
+            ))
+        return [future.result() for future in futures]
+    
+    def _get_pools(self):
+        """
+        Cria os processos sob demanda (depois do fork dos workers do
+        gunicorn): um executor de um processo por shard
+        """
+        with VideoService._pool_lock:
+            if VideoService._pools is None:
+                context = multiprocessing.get_context('forkserver')
+                VideoService._pools = [
+                    ProcessPoolExecutor(max_workers=1, mp_context=context)
+                    for _ in range(self.render_workers)
+                ]
+            return VideoService._pools
+    
+    def iter_video_frames(self, images_data, duration_per_image=3, transition=None,
+                          transition_duration=None, ken_burns=False):
+        """
+        Gera os frames do vídeo sob demanda (arrays RGB)
+        
+        Apenas o slide atual e o próximo ficam em memória. Sem transição nem
+        Ken Burns, o mesmo array é reutilizado para todos os frames do slide.
+        
+        Args:
+            transition: 'crossfade', 'slide', 'zoom' ou None; ocupa o final
+                de cada slide, sem alterar a duração total
+            transition_duration: Duração da transição em segundos
+            ken_burns: Aplica zoom/deslocamento lento em cada slide
+        """
+        if transition is not None and transition not in TRANSITION_FUNCTIONS:
+            raise ValueError(f'Transição inválida: {transition}')
+        if transition_duration is None:
+            transition_duration = self.transition_duration
+        
+        num_frames = max(1, int(round(duration_per_image * self.default_fps)))
+        transition_frames = 0
+        if transition:
+            transition_frames = min(int(round(transition_duration * self.default_fps)), num_frames // 2)
+        
+        def motion(frame, idx, k):
+            if not ken_burns:
+                return frame
+            return ken_burns_motion(frame, k / num_frames, idx)
+        
+        slides = (np.asarray(self._render_slide(idx, img_data)) for idx, img_data in enumerate(images_data))
+        current = next(slides, None)
+        idx = 0
+        while current is not None:
+            upcoming = next(slides, None)
+            blend_frames = transition_frames if upcoming is not None else 0
+            
+            for k in range(num_frames - blend_frames):
+                yield motion(current, idx, k)
+            
+            if blend_frames:
+                blend = TRANSITION_FUNCTIONS[transition]
+                # O próximo slide entra na posição inicial do seu movimento
+                target = motion(upcoming, idx + 1, 0)
+                for step in range(blend_frames):
+                    k = num_frames - blend_frames + step
+                    yield blend(motion(current, idx, k), target, (step + 1) / (blend_frames + 1))
+            
+            current = upcoming
+            idx += 1
+    
+    def export_mp4(self, images_data, duration_per_image=3, output_path=None, transition=None,
+                   transition_duration=None, ken_burns=False):
+        """
+        Renderiza o slideshow como MP4 (H.264) alimentando o encoder
+        com um gerador de frames (transições e Ken Burns opcionais,
+        ver iter_video_frames)
+        
+        Returns:
+            Informações sobre o arquivo gerado (caminho em 'path')
+        """
+        try:
+            from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+            
+            if output_path is None:
+                fd, output_path = tempfile.mkstemp(suffix='.mp4')
+                os.close(fd)
+            
+            writer = FFMPEG_VideoWriter(
+                output_path,
+                (self.default_width, self.default_height),
+                self.default_fps,
+                codec='libx264',
+                preset='veryfast',
+                ffmpeg_params=['-movflags', '+faststart']
+            )
+            total_frames = 0
+            try:
+                frames = self.iter_video_frames(
+                    images_data, duration_per_image, transition, transition_duration, ken_burns
+                )
+                for frame in frames:
+                    writer.write_frame(frame)
+                    total_frames += 1
+            finally:
+                writer.close()
+            
+            return {
+                'success': True,
+                'path': output_path,
+                'format': 'mp4',
+                'total_frames': total_frames,
+                'fps': self.default_fps,
+                'total_duration': len(images_data) * duration_per_image,
+                'resolution': f'{self.default_width}x{self.default_height}',
+                'file_size': os.path.getsize(output_path)
+            }
+            
+        except Exception as e:
+            if output_path and os.path.exists(output_path):
+                os.remove(output_path)
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _render_slide(self, idx, img_data):
+        """
+        Carrega, redimensiona e legenda a imagem de um slide
+        """
+        img = self._load_resized(idx, img_data)
+        
+        # Adiciona legenda se fornecida
+        if img_data.get('caption'):
+            img = self._add_caption(img, img_data['caption'])
+        
+        return img
+    
+    def _load_resized(self, idx, img_data):
+        """
+        Imagem do slide já decodificada e redimensionada (RGB)
+        
+        O resultado fica em cache pelo hash da origem e pela resolução, então
+        renderizar de novo o mesmo slideshow só refaz as legendas.
+        """
+        source = img_data.get('image')
+        size = (self.default_width, self.default_height)
+        cache_key = make_cache_key(self._source_key(idx, img_data), size)
+        pixels = self.image_cache.get(cache_key)
+        if pixels is not None:
+            return Image.frombytes('RGB', size, pixels)
+        
+        # Processa imagem
+        if isinstance(source, str):
+            if source.startswith('data:image'):
+                # Remove header do base64
+                img_base64 = source.split(',')[1]
+                img_bytes = base64.b64decode(img_base64)
+                img = Image.open(BytesIO(img_bytes))
+            else:
+                # Assume que é um caminho de arquivo
+                img = Image.open(source)
+        else:
+            # Cria imagem placeholder
+            img = self._create_placeholder_image(f"Slide {idx + 1}")
+        
+        # Redimensiona para tamanho padrão
+        img = img.resize(size, Image.Resampling.LANCZOS).convert('RGB')
+        self.image_cache.set(cache_key, img.tobytes())
+        return img
+    
+    @staticmethod
+    def _source_key(idx, img_data):
+        """
+        Identificador estável da imagem de origem de um slide
+        """
+        source = img_data.get('image')
+        if isinstance(source, str) and source.startswith('data:image'):
+            return hashlib.sha256(source.encode()).hexdigest()
+        if isinstance(source, str):
+            # Caminho de arquivo: identificado também por mtime e tamanho
+            st = os.stat(source)
+            return make_cache_key('file', os.path.abspath(source), st.st_mtime_ns, st.st_size)
+        return make_cache_key('placeholder', idx)
+    
     def _create_placeholder_image(self, text):
         """
         Cria uma imagem placeholder
@@ -95,18 +340,9 @@ class VideoService:
         img = Image.new('RGB', (self.default_width, self.default_height), color=(100, 100, 150))
         draw = ImageDraw.Draw(img)
         
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 60)
-        except:
-            font = ImageFont.load_default()
-        
         # Centraliza texto
-        text_bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
-        position = ((self.default_width - text_width) // 2, (self.default_height - text_height) // 2)
-        
-        draw.text(position, text, fill=(255, 255, 255), font=font)
+        font = get_font(FONT_BOLD, 60)
+        draw_centered_text(draw, text, font, self.default_width, self.default_height)
         
         return img
     
@@ -114,8 +350,6 @@ class VideoService:
         """
         Adiciona legenda na parte inferior da imagem
         """
-        draw = ImageDraw.Draw(img)
-        
         # Cria retângulo semi-transparente para o texto
         caption_height = 100
         overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
@@ -132,32 +366,14 @@ class VideoService:
         
         # Adiciona texto
         draw = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 28)
-        except:
-            font = ImageFont.load_default()
-        
-        # Quebra texto em múltiplas linhas se necessário
-        words = caption.split()
-        lines = []
-        current_line = []
-        
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            bbox = draw.textbbox((0, 0), test_line, font=font)
-            if bbox[2] - bbox[0] < self.default_width - 40:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
+        font = get_font(FONT_REGULAR, 28)
         
-        if current_line:
-            lines.append(' '.join(current_line))
+        # Quebra texto em múltiplas linhas se necessário (máximo 2 linhas)
+        lines = wrap_text(caption, font, self.default_width - 40, max_lines=2)
         
         # Desenha linhas de texto
         y_offset = self.default_height - caption_height + 20
-        for line in lines[:2]:  # Máximo 2 linhas
+        for line in lines:
             draw.text((20, y_offset), line, fill=(255, 255, 255), font=font)
             y_offset += 35
         
@@ -175,6 +391,6 @@ class VideoService:
             'format': 'slideshow',
             'resolution': f'{self.default_width}x{self.default_height}',
             'fps': self.default_fps,
-            'note': 'Vídeo criado como slideshow de imagens. Para exportar como MP4, use ferramentas de conversão.'
+            'note': 'Vídeo criado como slideshow de imagens. Para exportar como MP4, envie "format": "mp4".'
         }
 